@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""Benchmarks for the yabridge-updater download/extract/install pipeline.
+
+Starts a local HTTP server that imitates the GitHub endpoints used by the
+updater (branches, workflow runs, artifacts, releases, redirected zip and
+tarball downloads) and runs the updater's functions against it with
+synthetic artifacts. Everything happens in a temporary home directory, the
+real installation and configuration are never touched.
+
+Example:
+    python3 benchmarks/benchmark_updater.py --size-mb 20 --branches 40 --latency-ms 50 \\
+        --output results.json
+"""
+import argparse
+import builtins
+import contextlib
+import gzip
+import hashlib
+import http.server
+import io
+import json
+import os
+import random
+import shutil
+import socketserver
+import statistics
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import yabridge_updater as updater  # noqa: E402
+
+REPO_PATH = f"/repos/{updater.REPO}"
+RELEASE_TAG = "5.1.1"
+
+
+# --- Synthetic artifacts ---
+
+
+def make_tar_gz(prefix, files):
+    """Builds a reproducible .tar.gz with all files below `prefix/`."""
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        for name, data in files.items():
+            info = tarfile.TarInfo(f"{prefix}/{name}")
+            info.size = len(data)
+            info.mode = 0o755
+            tar.addfile(info, io.BytesIO(data))
+    return gzip.compress(buf.getvalue(), mtime=0)
+
+
+def make_zip(name, data):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zip_file:
+        zip_file.writestr(zipfile.ZipInfo(name, (2020, 1, 1, 0, 0, 0)), data)
+    return buf.getvalue()
+
+
+class FakeGitHub:
+    """State of the fake GitHub: branches, build artifacts and request counters."""
+
+    def __init__(self, branch_count, size, latency, seed=0):
+        rng = random.Random(seed)
+        half = max(size // 2, 1)
+        self.latency = latency
+        self.branches = ["master"] + [f"feature-{i}" for i in range(branch_count - 1)]
+        self.sha = hashlib.sha1(str(seed).encode()).hexdigest()
+        # Random content doesn't compress, so the artifact sizes are close to `size`
+        ctl_script = b"#!/bin/sh\nexit 0\n"
+        self.blobs = {
+            "ctl": make_zip("yabridgectl.tar.gz", make_tar_gz(
+                "yabridgectl", {"yabridgectl": ctl_script + rng.randbytes(half)})),
+            "libs": make_zip("yabridge.tar.gz", make_tar_gz("yabridge", {
+                "libyabridge-vst2.so": rng.randbytes(half // 2),
+                "libyabridge-vst3.so": rng.randbytes(half // 2)})),
+            "release": make_tar_gz("yabridge", {
+                "yabridgectl": ctl_script + rng.randbytes(half),
+                "libyabridge-vst3.so": rng.randbytes(half)}),
+        }
+        self.requests = {}
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+
+    def count(self, endpoint, sent=0):
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            self.bytes_sent += sent
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = {}
+            self.bytes_sent = 0
+
+
+def make_handler(fake):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body=b"", headers=None):
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, endpoint, obj):
+            body = json.dumps(obj).encode()
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            rate_limit = {"X-RateLimit-Remaining": "4999",
+                          "X-RateLimit-Reset": str(int(time.time()) + 3600)}
+            if self.headers.get("If-None-Match") == etag:
+                fake.count(endpoint + " (304)")
+                return self._send(304, headers={"ETag": etag, **rate_limit})
+            fake.count(endpoint, len(body))
+            self._send(200, body, {"Content-Type": "application/json", "ETag": etag, **rate_limit})
+
+        def _send_blob(self, endpoint, data):
+            etag = f'"{hashlib.md5(data).hexdigest()}"'
+            start = 0
+            range_header = self.headers.get("Range", "")
+            if range_header.startswith("bytes=") and self.headers.get("If-Range", etag) == etag:
+                start = int(range_header[6:].split("-")[0])
+            headers = {"ETag": etag, "Accept-Ranges": "bytes"}
+            if start:
+                headers["Content-Range"] = f"bytes {start}-{len(data) - 1}/{len(data)}"
+            fake.count(endpoint, len(data) - start)
+            self._send(206 if start else 200, data[start:], headers)
+
+        def do_GET(self):
+            if fake.latency:
+                time.sleep(fake.latency)
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            path = url.path
+            base = f"http://127.0.0.1:{self.server.server_port}"
+
+            if path == f"{REPO_PATH}/branches":
+                return self._send_json("branches", [{"name": name} for name in fake.branches])
+            if path == f"{REPO_PATH}/actions/runs":
+                branch = query.get("branch", [None])[0]
+                page = int(query.get("page", ["1"])[0])
+                per_page = int(query.get("per_page", ["30"])[0])
+                runs = [{"id": i, "head_branch": name, "head_sha": fake.sha,
+                         "artifacts_url": f"{base}{REPO_PATH}/actions/runs/{i}/artifacts"}
+                        for i, name in enumerate(fake.branches)]
+                if branch:
+                    runs = [run for run in runs if run["head_branch"] == branch]
+                runs = runs[(page - 1) * per_page:page * per_page]
+                return self._send_json("runs", {"total_count": len(runs), "workflow_runs": runs})
+            if path.startswith(f"{REPO_PATH}/actions/runs/") and path.endswith("/artifacts"):
+                artifacts = [{"id": artifact_id, "name": name, "size_in_bytes": len(fake.blobs[kind]),
+                              "digest": "sha256:" + hashlib.sha256(fake.blobs[kind]).hexdigest(),
+                              "archive_download_url": f"{base}{REPO_PATH}/actions/artifacts/{artifact_id}/zip"}
+                             for artifact_id, name, kind in ((1, "yabridgectl", "ctl"), (2, "yabridge-libs", "libs"))]
+                return self._send_json("artifacts", {"total_count": 2, "artifacts": artifacts})
+            if path.startswith(f"{REPO_PATH}/actions/artifacts/") and path.endswith("/zip"):
+                # GitHub redirects artifact downloads to a blob storage host
+                kind = "ctl" if path.split("/")[-2] == "1" else "libs"
+                fake.count("artifact redirect")
+                return self._send(302, headers={"Location": f"{base}/blobs/{kind}"})
+            if path.startswith("/blobs/"):
+                return self._send_blob("artifact download", fake.blobs[path.split("/")[-1]])
+            if path == f"{REPO_PATH}/releases/latest":
+                asset_name = f"yabridge-{RELEASE_TAG}.tar.gz"
+                return self._send_json("releases/latest", {"tag_name": RELEASE_TAG, "assets": [{
+                    "id": 1, "name": asset_name, "size": len(fake.blobs["release"]),
+                    "digest": "sha256:" + hashlib.sha256(fake.blobs["release"]).hexdigest(),
+                    "browser_download_url": f"{base}/releases/download/{asset_name}"}]})
+            if path.startswith("/releases/download/"):
+                return self._send_blob("release download", fake.blobs["release"])
+            fake.count("404")
+            self._send(404)
+
+    return Handler
+
+
+class FakeGitHubServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+# --- Measurement ---
+
+
+def bytes_written():
+    """Bytes this process passed to write() so far (Linux only, 0 elsewhere)."""
+    try:
+        for line in Path("/proc/self/io").read_text().splitlines():
+            if line.startswith("wchar:"):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def use_home(home):
+    """Points all paths of the updater below the configuration directory into `home`."""
+    old_config_dir = updater.CONFIG_DIR
+    updater.HOME = home
+    updater.CONFIG_DIR = home / ".config" / "yabridge-updater"
+    for name, value in list(vars(updater).items()):
+        if isinstance(value, Path) and old_config_dir in value.parents:
+            setattr(updater, name, updater.CONFIG_DIR / value.relative_to(old_config_dir))
+    updater.CONFIG_DIR.mkdir(parents=True, exist_ok=True)
+
+
+@contextlib.contextmanager
+def answers(*replies):
+    """Answers interactive prompts with the given replies (then with '1')."""
+    replies = iter(replies)
+    original_input = builtins.input
+    builtins.input = lambda prompt="": next(replies, "1")
+    try:
+        yield
+    finally:
+        builtins.input = original_input
+
+
+def measure(name, fake, func, setup=None):
+    """Runs `func` quietly and returns its timings and counters."""
+    if setup:
+        setup()
+    fake.reset_counters()
+    written = bytes_written()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        func()
+    wall_time = time.perf_counter() - started
+    return {"scenario": name, "wall_time": wall_time, "bytes_written": bytes_written() - written,
+            "bytes_downloaded": fake.bytes_sent, "requests": sum(fake.requests.values()),
+            "requests_by_endpoint": dict(sorted(fake.requests.items()))}
+
+
+# --- Scenarios ---
+
+
+def make_backups(yabridge_dir, count, size):
+    backup_base_dir = yabridge_dir.parent / "yabridge-backups"
+    backup_base_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        backup_dir = backup_base_dir / f"yabridge-backup-2024-01-01-{i:06d}"
+        backup_dir.mkdir()
+        (backup_dir / "libyabridge-vst3.so").write_bytes(os.urandom(size))
+        (backup_dir / ".version").write_text(json.dumps({"sha": f"{i:040x}", "branch": "master"}))
+
+
+def run_scenarios(args, fake, api_url):
+    results = []
+    size = int(args.size_mb * 1024 * 1024)
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory(prefix="yabridge-bench-") as tmpdir:
+            home = Path(tmpdir)
+            use_home(home)
+            yabridge_dir = home / ".local" / "share" / "yabridge"
+            client = updater.GitHubClient(api_url=api_url)
+            store = updater.ArtifactStore()
+            backup_base_dir = yabridge_dir.parent / "yabridge-backups"
+
+            def clear_backups():
+                # Backup names have a resolution of one second, consecutive installs would collide
+                shutil.rmtree(backup_base_dir, ignore_errors=True)
+
+            def select():
+                with answers("1"):
+                    updater.select_branch(client, None)
+            results.append(measure("select_branch", fake, select))
+
+            def install(store=None, backups=None, delta=False):
+                sha, artifacts_url = updater.get_latest_run_info("master", client)
+                updater.perform_installation(artifacts_url, client, yabridge_dir, sha, "master", store, backups,
+                                             delta=delta)
+            results.append(measure("perform_installation", fake, install, clear_backups))
+            results.append(measure("perform_installation (cached)", fake, lambda: install(store), clear_backups))
+            results.append(measure("perform_installation (cached, warm)", fake, lambda: install(store), clear_backups))
+            results.append(measure("perform_installation (cached, delta)", fake,
+                                   lambda: install(store, delta=True), clear_backups))
+            xz_backups = updater.BackupStore(backup_base_dir, "xz")
+            results.append(measure("perform_installation (xz backup)", fake,
+                                   lambda: install(store, xz_backups), clear_backups))
+
+            def install_stable():
+                tag, assets = updater.get_latest_stable_info(client)
+                updater.perform_stable_installation(assets, client, yabridge_dir, tag)
+            results.append(measure("perform_stable_installation", fake, install_stable, clear_backups))
+
+            clear_backups()
+            make_backups(yabridge_dir, args.backups, max(size // 4, 1))
+
+            def restore():
+                with answers("1"):
+                    updater.restore_from_backup(yabridge_dir)
+            results.append(measure("restore_from_backup", fake, restore))
+            results.append(measure("prune_backups", fake,
+                                   lambda: updater.prune_backups(yabridge_dir.parent, {"keep_last": 5})))
+            client.close()
+    return results
+
+
+def summarize(results):
+    """Groups repeated runs by scenario and reports the median values."""
+    summary = {}
+    for result in results:
+        summary.setdefault(result["scenario"], []).append(result)
+    rows = []
+    for scenario, runs in summary.items():
+        rows.append({
+            "scenario": scenario,
+            "runs": len(runs),
+            "wall_time_median": statistics.median(r["wall_time"] for r in runs),
+            "wall_time_min": min(r["wall_time"] for r in runs),
+            "bytes_written_median": statistics.median(r["bytes_written"] for r in runs),
+            "bytes_downloaded_median": statistics.median(r["bytes_downloaded"] for r in runs),
+            "requests_median": statistics.median(r["requests"] for r in runs),
+            "requests_by_endpoint": runs[-1]["requests_by_endpoint"],
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=10,
+                        help="Approximate size of each synthetic artifact in MB (default: 10).")
+    parser.add_argument("--branches", type=int, default=20,
+                        help="Number of branches served by the fake GitHub (default: 20).")
+    parser.add_argument("--latency-ms", type=float, default=20,
+                        help="Latency added to every request in milliseconds (default: 20).")
+    parser.add_argument("--backups", type=int, default=20,
+                        help="Number of backups created for the restore and prune scenarios (default: 20).")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="How often every scenario is run (default: 3).")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    fake = FakeGitHub(args.branches, int(args.size_mb * 1024 * 1024), args.latency_ms / 1000)
+    server = FakeGitHubServer(("127.0.0.1", 0), make_handler(fake))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        results = run_scenarios(args, fake, f"http://127.0.0.1:{server.server_port}")
+    finally:
+        server.shutdown()
+
+    rows = summarize(results)
+    print(f"{'Scenario':<38} {'Wall (s)':>9} {'Written (MB)':>13} {'Downloaded (MB)':>16} {'Requests':>9}")
+    for row in rows:
+        print(f"{row['scenario']:<38} {row['wall_time_median']:>9.3f} "
+              f"{row['bytes_written_median'] / 1048576:>13.1f} {row['bytes_downloaded_median'] / 1048576:>16.1f} "
+              f"{row['requests_median']:>9.0f}")
+
+    if args.output:
+        report = {"parameters": {key: str(value) if isinstance(value, Path) else value
+                                 for key, value in vars(args).items()},
+                  "python": sys.version.split()[0], "timestamp": time.time(),
+                  "results": rows, "raw": results}
+        args.output.write_text(json.dumps(report, indent=4))
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# yabridge_updater reads HOME at import time, keep the tests away from the real config
+os.environ["HOME"] = tempfile.mkdtemp(prefix="yabridge-updater-tests-")
+sys.path.insert(0, str(ROOT))
@@ -0,0 +1,111 @@
+import json
+import os
+import shutil
+
+import pytest
+
+import yabridge_updater as yu
+
+
+def make_install(path, libs=b"libs", ctl=b"ctl", version="aaaa"):
+    path.mkdir(parents=True)
+    (path / "lib").mkdir()
+    (path / "lib" / "libyabridge-vst3.so").write_bytes(libs)
+    (path / "yabridgectl").write_bytes(ctl)
+    os.chmod(path / "yabridgectl", 0o755)
+    os.symlink("lib/libyabridge-vst3.so", path / "libyabridge.so")
+    (path / ".version").write_text(json.dumps({"sha": version, "branch": "master"}))
+    return path
+
+
+@pytest.fixture
+def store(tmp_path):
+    return yu.BackupStore(tmp_path / "yabridge-backups")
+
+
+def blob_of(store, path):
+    return next(blob for blob in store.blob_dir.iterdir() if os.path.samefile(blob, path))
+
+
+def test_identical_files_share_one_blob(tmp_path, store):
+    first = store.create(make_install(tmp_path / "yabridge"))
+    second = store.create(make_install(tmp_path / "yabridge", version="bbbb"))
+    assert first != second
+    assert os.path.samefile(first / "yabridgectl", second / "yabridgectl")
+    assert os.path.samefile(first / "lib" / "libyabridge-vst3.so", second / "lib" / "libyabridge-vst3.so")
+    # yabridgectl, the library and two different .version files
+    assert len(list(store.blob_dir.iterdir())) == 4
+
+
+def test_manifest_and_catalog(tmp_path, store):
+    backup = store.create(make_install(tmp_path / "yabridge"))
+    manifest = json.loads((backup / yu.BACKUP_MANIFEST_FILE).read_text())
+    assert manifest["files"]["yabridgectl"]["mode"] == 0o755
+    assert manifest["symlinks"] == {"libyabridge.so": "lib/libyabridge-vst3.so"}
+    (entry,) = store.catalog()
+    assert entry["name"] == backup.name
+    assert entry["sha"] == "aaaa"
+    assert entry["blobs"][manifest["files"]["yabridgectl"]["sha256"]] == len(b"ctl")
+
+
+def test_restore_recreates_the_installation(tmp_path, store):
+    backup = store.create(make_install(tmp_path / "yabridge"))
+    target = tmp_path / "restored"
+    store.restore(backup, target)
+    assert (target / "yabridgectl").read_bytes() == b"ctl"
+    assert os.stat(target / "yabridgectl").st_mode & 0o777 == 0o755
+    assert os.readlink(target / "libyabridge.so") == "lib/libyabridge-vst3.so"
+    assert not (target / yu.BACKUP_MANIFEST_FILE).exists()
+    assert not backup.exists()
+    assert store.catalog() == []
+
+
+def test_garbage_collection_keeps_blobs_in_use(tmp_path, store):
+    first = store.create(make_install(tmp_path / "yabridge"))
+    second = store.create(make_install(tmp_path / "yabridge", ctl=b"new ctl", version="bbbb"))
+    old_ctl = blob_of(store, first / "yabridgectl")
+
+    shutil.rmtree(first)
+    removed, freed = store.collect_garbage()
+    # The old yabridgectl and the old .version were only used by the first backup
+    assert removed == 2
+    assert not old_ctl.exists()
+    assert blob_of(store, second / "lib" / "libyabridge-vst3.so").exists()
+
+    shutil.rmtree(second)
+    removed, _ = store.collect_garbage()
+    assert removed == 3
+    assert list(store.blob_dir.iterdir()) == []
+
+
+def test_freed_size_only_counts_unshared_blobs(tmp_path, store):
+    first = store.create(make_install(tmp_path / "yabridge", libs=b"x" * 1000, ctl=b"y" * 100))
+    second = store.create(make_install(tmp_path / "yabridge", libs=b"x" * 1000, ctl=b"z" * 10,
+                                       version="bbbb"))
+    version_size = len(json.dumps({"sha": "aaaa", "branch": "master"}))
+    assert store.freed_size([first]) == 100 + version_size
+    assert store.freed_size([first, second]) == 1000 + 100 + 10 + 2 * version_size
+
+
+def test_backup_made_by_copying_keeps_the_installation(tmp_path, store):
+    install = make_install(tmp_path / "yabridge")
+    backup = store.create(install, copy=True)
+    assert (install / "yabridgectl").read_bytes() == b"ctl"
+    assert os.path.samefile(install / "yabridgectl", backup / "yabridgectl")
+
+
+def test_restore_never_changes_the_mode_of_shared_blobs(tmp_path, store):
+    # Same content, different modes: both backups share the blob of the first one
+    first = store.create(make_install(tmp_path / "yabridge"))
+    install = make_install(tmp_path / "yabridge", version="bbbb")
+    os.chmod(install / "yabridgectl", 0o700)
+    second = store.create(install)
+    blob = blob_of(store, first / "yabridgectl")
+    blob_mode = os.stat(blob).st_mode & 0o777
+
+    target = tmp_path / "restored"
+    store.restore(second, target)
+    assert os.stat(target / "yabridgectl").st_mode & 0o777 == 0o700
+    assert not os.path.samefile(target / "yabridgectl", blob)
+    assert os.stat(blob).st_mode & 0o777 == blob_mode
+    assert os.stat(first / "yabridgectl").st_mode & 0o777 == blob_mode
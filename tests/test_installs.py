@@ -0,0 +1,58 @@
+import argparse
+from pathlib import Path
+
+import pytest
+
+import yabridge_updater as yu
+
+
+@pytest.fixture(autouse=True)
+def config(tmp_path, monkeypatch):
+    monkeypatch.setattr(yu, "CONFIG_DIR", tmp_path / "config")
+    monkeypatch.setattr(yu, "INSTALLS_CONFIG_FILE", tmp_path / "config" / "installs.json")
+
+
+def add(name, path, default_dir=None, branch="master"):
+    args = argparse.Namespace(installs_action="add", name=name, path=str(path), branch=branch)
+    yu.manage_installs(args, default_dir)
+
+
+def test_shared_parent_conflict():
+    assert yu.shared_parent_conflict(["/a/yabridge", "/b/yabridge"]) is None
+    # The same installation listed twice is fine
+    assert yu.shared_parent_conflict(["/a/yabridge", "/a/yabridge"]) is None
+    assert yu.shared_parent_conflict(["/a/yabridge", "/b/x", "/a/yabridge-dev"]) == \
+        (Path("/a/yabridge"), Path("/a/yabridge-dev"))
+
+
+def test_installs_in_separate_directories_are_added(tmp_path):
+    add("main", tmp_path / "main" / "yabridge")
+    add("dev", tmp_path / "dev" / "yabridge", branch="feature")
+    assert yu.load_installs() == {
+        "main": {"path": str(tmp_path / "main" / "yabridge"), "branch": "master"},
+        "dev": {"path": str(tmp_path / "dev" / "yabridge"), "branch": "feature"}}
+
+
+def test_installs_sharing_a_directory_are_rejected(tmp_path):
+    add("main", tmp_path / "yabridge")
+    with pytest.raises(ValueError):
+        add("dev", tmp_path / "yabridge-dev")
+    assert list(yu.load_installs()) == ["main"]
+
+
+def test_existing_default_installation_is_taken_into_account(tmp_path):
+    default_dir = tmp_path / "yabridge"
+    # Only an installation that exists can get in the way
+    add("dev", tmp_path / "yabridge-dev", default_dir)
+    yu.manage_installs(argparse.Namespace(installs_action="remove", name="dev"), default_dir)
+    default_dir.mkdir()
+    add("main", default_dir, default_dir)
+    with pytest.raises(ValueError):
+        add("dev", tmp_path / "yabridge-dev", default_dir)
+
+
+def test_update_all_rejects_edited_config(tmp_path):
+    installs = {"main": {"path": str(tmp_path / "yabridge"), "branch": "master"},
+                "dev": {"path": str(tmp_path / "yabridge-dev"), "branch": "feature"}}
+    with pytest.raises(ValueError):
+        yu.check_install_paths(installs)
@@ -0,0 +1,132 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import yabridge_updater as yu
+from conftest import ROOT
+
+# Takes a lock in a separate process and holds it until its stdin is closed
+HOLDER = f"""
+import sys
+sys.path.insert(0, {str(ROOT)!r})
+from pathlib import Path
+import yabridge_updater as yu
+f = yu.try_lock(Path(sys.argv[1]), shared=sys.argv[2] == "shared")
+print("locked" if f else "busy", flush=True)
+sys.stdin.read()
+"""
+
+
+class Holder:
+    def __init__(self, lock_file, shared=False):
+        self.process = subprocess.Popen(
+            [sys.executable, "-c", HOLDER, str(lock_file), "shared" if shared else "exclusive"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        self.state = self.process.stdout.readline().strip()
+
+    def release(self):
+        self.process.stdin.close()
+        self.process.wait(timeout=10)
+
+
+@pytest.fixture
+def lock_file(tmp_path):
+    return tmp_path / "config" / "lock"
+
+
+@pytest.fixture
+def holders():
+    started = []
+    yield started
+    for holder in started:
+        if holder.process.poll() is None:
+            holder.release()
+
+
+def hold(holders, lock_file, shared=False):
+    holder = Holder(lock_file, shared)
+    holders.append(holder)
+    return holder
+
+
+def test_exclusive_lock_excludes_everyone(lock_file, holders):
+    assert hold(holders, lock_file).state == "locked"
+    assert yu.try_lock(lock_file) is None
+    assert yu.try_lock(lock_file, shared=True) is None
+
+
+def test_shared_locks_exclude_only_exclusive_holders(lock_file, holders):
+    assert hold(holders, lock_file, shared=True).state == "locked"
+    shared = yu.try_lock(lock_file, shared=True)
+    assert shared is not None
+    shared.close()
+    assert yu.try_lock(lock_file) is None
+
+
+def test_exclusive_holder_records_itself(lock_file):
+    f = yu.try_lock(lock_file)
+    try:
+        owner = yu.read_lock_owner(lock_file)
+        assert owner["pid"] == os.getpid()
+        assert owner["host"] == socket.gethostname()
+    finally:
+        f.close()
+
+
+def test_lock_is_released_when_the_holder_dies(lock_file, holders):
+    holder = hold(holders, lock_file)
+    inode = lock_file.stat().st_ino
+    holder.process.kill()
+    holder.process.wait(timeout=10)
+    f = yu.try_lock(lock_file)
+    assert f is not None
+    f.close()
+    assert lock_file.stat().st_ino == inode
+
+
+def test_record_of_exited_owner_doesnt_break_a_shared_lock(lock_file, holders):
+    # The last exclusive owner has exited, a reader holds the lock now
+    lock_file.parent.mkdir(parents=True)
+    dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                          capture_output=True, text=True, check=True)
+    lock_file.write_text(json.dumps({"pid": int(dead.stdout), "host": socket.gethostname()}))
+    assert hold(holders, lock_file, shared=True).state == "locked"
+    assert yu.try_lock(lock_file) is None
+    assert lock_file.exists()
+
+
+def test_lock_on_a_removed_file_isnt_handed_out(lock_file, holders):
+    # A lock file deleted while held (e.g. by uninstall.sh) must not exclude new holders
+    hold(holders, lock_file)
+    lock_file.unlink()
+    f = yu.try_lock(lock_file)
+    assert f is not None
+    assert os.fstat(f.fileno()).st_ino == lock_file.stat().st_ino
+    f.close()
+
+
+def test_hold_lock_fails_immediately_without_timeout(lock_file, holders):
+    hold(holders, lock_file)
+    with pytest.raises(TimeoutError):
+        yu.hold_lock(lock_file, timeout=0)
+
+
+def test_hold_lock_times_out(lock_file, holders, monkeypatch):
+    monkeypatch.setattr(yu, "LOCK_POLL_INTERVAL", 0.01)
+    hold(holders, lock_file)
+    with pytest.raises(TimeoutError):
+        yu.hold_lock(lock_file, timeout=0.1)
+
+
+def test_hold_lock_waits_for_the_holder(lock_file, holders, monkeypatch):
+    monkeypatch.setattr(yu, "LOCK_POLL_INTERVAL", 0.01)
+    holder = hold(holders, lock_file)
+    threading.Timer(0.2, holder.release).start()
+    f = yu.hold_lock(lock_file, timeout=10)
+    assert f is not None
+    f.close()
@@ -0,0 +1,77 @@
+import datetime
+
+import yabridge_updater as yu
+
+MB = 1024 * 1024
+NOW = datetime.datetime(2026, 6, 15, 12).timestamp()
+DAY = 86400
+
+
+def entry(name, age_days=0, branch="master", size=MB, blobs=None):
+    result = {"name": name, "branch": branch, "created": NOW - age_days * DAY, "size": size,
+              "sha": None, "files": 1, "format": "dir", "invalid_version": False}
+    if blobs is not None:
+        result["blobs"] = blobs
+    return result
+
+
+def pruned(entries, **policy):
+    return [e["name"] for e, _ in yu.select_backups_to_prune(entries, policy, now=NOW)]
+
+
+def test_without_rules_nothing_is_pruned():
+    entries = [entry(f"b{i}", i) for i in range(5)]
+    assert pruned(entries) == []
+
+
+def test_keep_last():
+    entries = [entry(f"b{i}", i) for i in range(5)]
+    assert pruned(entries, keep_last=2) == ["b2", "b3", "b4"]
+
+
+def test_keep_per_branch():
+    entries = [entry("m0", 0), entry("f0", 1, "feature"), entry("m1", 2),
+               entry("f1", 3, "feature"), entry("m2", 4)]
+    assert pruned(entries, keep_per_branch=1) == ["m1", "f1", "m2"]
+
+
+def test_keep_daily_keeps_the_newest_backup_of_each_day():
+    entries = [entry("today-late", 0), entry("today-early", 0.1),
+               entry("yesterday", 1), entry("two-days-ago", 2)]
+    assert pruned(entries, keep_daily=2) == ["today-early", "two-days-ago"]
+
+
+def test_keep_rules_are_combined():
+    entries = [entry(f"b{i}", i * 40) for i in range(4)]
+    # b0 by keep_last, b0-b2 each start a new month
+    assert pruned(entries, keep_last=1, keep_monthly=3) == ["b3"]
+
+
+def test_max_age_never_deletes_the_newest_backup():
+    entries = [entry("b0", 100), entry("b1", 200)]
+    assert pruned(entries, max_age_days=30) == ["b1"]
+
+
+def test_max_size_deletes_the_oldest_backups():
+    entries = [entry(f"b{i}", i, size=4 * MB) for i in range(4)]
+    assert pruned(entries, max_size_mb=9) == ["b2", "b3"]
+
+
+def test_max_size_counts_shared_blobs_once():
+    entries = [entry(f"b{i}", i, size=10 * MB, blobs={"shared": 9 * MB, f"own{i}": MB})
+               for i in range(5)]
+    assert pruned(entries, max_size_mb=14) == []
+    assert pruned(entries, max_size_mb=12) == ["b3", "b4"]
+
+
+def test_max_size_counts_archives_in_full():
+    entries = [entry("dir", 0, size=10 * MB, blobs={"shared": 10 * MB}),
+               entry("archive", 1, size=10 * MB), entry("older", 2, size=10 * MB, blobs={"shared": 10 * MB}),
+               entry("oldest", 3, size=10 * MB, blobs={"other": 10 * MB})]
+    # The archive doesn't share anything, "older" adds nothing on top of "dir"
+    assert pruned(entries, max_size_mb=25) == ["oldest"]
+
+
+def test_result_is_ordered_newest_first():
+    entries = [entry(f"b{i}", i * 10) for i in range(4)]
+    assert pruned(entries, keep_last=3, max_age_days=15) == ["b2", "b3"]
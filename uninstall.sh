@@ -177,6 +177,10 @@ main() {
         # Backup-Pfad ableiten
         YABRIDGE_PARENT_DIR=$(dirname "$YABRIDGE_INSTALL_DIR")
         BACKUP_DIR="$YABRIDGE_PARENT_DIR/yabridge-backups"
+        # Gestaffelte Installationen: das Installationsverzeichnis ist nur ein Symlink hierauf
+        VERSIONS_DIR="$YABRIDGE_PARENT_DIR/yabridge-versions"
+        # Sperrdatei der Installation, liegt neben ihr
+        LOCK_FILE="$YABRIDGE_PARENT_DIR/.$(basename "$YABRIDGE_INSTALL_DIR").lock"
 
         echo
         if [ -d "$CONFIG_DIR" ]; then
@@ -189,12 +193,12 @@ main() {
             fi
         fi
 
-        if [ -d "$YABRIDGE_INSTALL_DIR" ] || [ -d "$BACKUP_DIR" ]; then
+        if [ -d "$YABRIDGE_INSTALL_DIR" ] || [ -d "$BACKUP_DIR" ] || [ -d "$VERSIONS_DIR" ]; then
             prompt_text=$(printf "$MSG_PROMPT_DELETE_YABRIDGE_DATA" "$YABRIDGE_INSTALL_DIR" "$BACKUP_DIR")
             read -p "$(echo -e "${C_YELLOW}${prompt_text}${C_RESET}")" -r
             if [[ $REPLY =~ ^[JjYy]([Aa][Ss])?$ ]]; then
                 info "$MSG_INFO_DELETING_YABRIDGE_DATA"
-                rm -rf "$YABRIDGE_INSTALL_DIR" "$BACKUP_DIR"
+                rm -rf "$YABRIDGE_INSTALL_DIR" "$BACKUP_DIR" "$VERSIONS_DIR" "$LOCK_FILE"
                 success "$MSG_SUCCESS_YABRIDGE_DATA_DELETED"
             fi
         fi
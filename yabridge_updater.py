@@ -1,19 +1,39 @@
 #!/usr/bin/env python3
 import argparse
+import atexit
+import concurrent.futures
+import contextlib
 import datetime
+import fcntl
 import locale
 import getpass
+import hashlib
+import io
+import itertools
 import json
+import lzma
+import random
 import stat
 import os
 import shutil
+import socket
 import subprocess
 import sys
 import tarfile
 import tempfile
+import threading
+import time
 import zipfile
 from pathlib import Path
 
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+# Imported by load_requests() once it's needed, a cached `check` gets by without it
+requests = None
+
 # --- Configuration ---
 REPO = "robbert-vdh/yabridge"
 # TODO: Trage hier das GitHub-Repository ein, in dem dieses Updater-Skript gehostet wird.
@@ -24,6 +44,84 @@ HOME = Path.home()
 CONFIG_DIR = HOME / ".config" / "yabridge-updater"
 TOKEN_FILE = CONFIG_DIR / "token"
 PATH_CONFIG_FILE = CONFIG_DIR / "path"
+GITHUB_API_URL = "https://api.github.com"
+# HTTP client: (connect, read) timeouts in seconds, pool size and retry behaviour
+HTTP_TIMEOUT = (10, 60)
+HTTP_POOL_SIZE = 16
+HTTP_MAX_RETRIES = 3
+HTTP_BACKOFF_FACTOR = 1.0
+# Longest time we are willing to wait for a secondary rate limit to clear
+HTTP_MAX_RATE_LIMIT_WAIT = 60
+# Conditional request cache for GitHub API responses (ETag / Last-Modified)
+HTTP_CACHE_DIR = CONFIG_DIR / "cache" / "http"
+HTTP_CACHE_MAX_BYTES = 5 * 1024 * 1024
+# Content-addressed store of downloaded artifacts and release tarballs
+ARTIFACT_STORE_DIR = CONFIG_DIR / "cache" / "artifacts"
+ARTIFACT_STORE_MAX_MB = 1024
+ARTIFACT_STORE_MAX_AGE_DAYS = 30
+# Interrupted downloads are kept here so they can be resumed later
+DOWNLOAD_STAGING_DIR = CONFIG_DIR / "cache" / "partial"
+DOWNLOAD_STAGING_MAX_AGE_DAYS = 7
+DOWNLOAD_MAX_RETRIES = 5
+# Download chunk sizes adapt to the link speed within these bounds
+DOWNLOAD_MIN_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_MAX_CHUNK_SIZE = 1024 * 1024
+# Progress bars are redrawn at most this often (in seconds)
+PROGRESS_REDRAW_INTERVAL = 0.1
+# Backups keep their files in a hardlinked, content-addressed store below the backup directory
+BACKUP_STORE_DIRNAME = ".store"
+BACKUP_MANIFEST_FILE = ".backup-manifest.json"
+# Pruned backups are renamed into this directory first and deleted from there in parallel
+BACKUP_TRASH_DIRNAME = ".trash"
+BACKUP_DELETE_WORKERS = 4
+# Optional archive formats for backups, the index is always the first member
+BACKUP_ARCHIVE_SUFFIXES = {"xz": ".tar.xz", "zstd": ".tar.zst"}
+BACKUP_INDEX_FILE = ".backup-index.json"
+BACKUP_MAX_COMPRESSION_LEVELS = {"xz": 9, "zstd": 22}
+# Staged installations live in versioned directories, `current` points to the active one
+STAGED_VERSIONS_DIRNAME = "yabridge-versions"
+STAGED_CURRENT_LINK = "current"
+STAGED_KEEP_VERSIONS = 3
+# Delta installs hold back files of unchanged size until their digest is known
+DELTA_SPOOL_SIZE = 32 * 1024 * 1024
+# Retention policy applied by prune-backups and after every installation
+RETENTION_CONFIG_FILE = CONFIG_DIR / "retention.json"
+DEFAULT_RETENTION_POLICY = {"keep_last": 5}
+# Metadata of all backups, so menus and pruning don't have to inspect every backup
+BACKUP_CATALOG_FILE = "index.json"
+BACKUP_CATALOG_VERSION = 2
+# Fingerprints of the installation and the plugin directories at the last yabridgectl sync
+SYNC_STATE_FILE = CONFIG_DIR / "sync-state.json"
+YABRIDGECTL_CONFIG_FILE = HOME / ".config" / "yabridgectl" / "config.toml"
+# Timing spans of every run can be appended here with --metrics-log
+METRICS_LOG_FILE = CONFIG_DIR / "metrics.jsonl"
+# Exit codes, so schedulers can tell the outcomes of an unattended run apart
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_DECLINED = 3
+EXIT_UPDATE_AVAILABLE = 10
+# `check` answers from this cache of the latest remote versions while it's fresh
+CHECK_CACHE_FILE = CONFIG_DIR / "check-cache.json"
+CHECK_CACHE_TTL = 15 * 60
+# Advisory locks: one for the config directory (caches, token, state files) and one per
+# installation, kept next to it as `.<name>.lock`. Read-only commands share them.
+CONFIG_LOCK_FILE = CONFIG_DIR / "lock"
+LOCK_TIMEOUT_SECONDS = 600
+LOCK_POLL_INTERVAL = 0.2
+# Background pre-fetching (`daemon`): check interval, random delay, retries and rate limit reserve
+DAEMON_INTERVAL_MINUTES = 360
+DAEMON_JITTER_SECONDS = 600
+DAEMON_RETRY_SECONDS = 300
+DAEMON_MIN_RATE_LIMIT = 100
+SYSTEMD_USER_DIR = HOME / ".config" / "systemd" / "user"
+SYSTEMD_UNIT_NAME = "yabridge-updater-prefetch"
+# Named installations for `update --all`: {"name": {"path": ..., "branch": ...}}
+INSTALLS_CONFIG_FILE = CONFIG_DIR / "installs.json"
+# Maximum number of concurrent GitHub API requests when probing branches
+DEFAULT_PROBE_WORKERS = 8
+# Branch discovery through the workflow runs listing
+DISCOVERY_PAGE_SIZE = 100
+DISCOVERY_MAX_PAGES = 10
 
 # --- Internationalization (i18n) ---
 LANG = 'de'  # Default to German
@@ -55,6 +153,8 @@ TRANSLATIONS = {
     "header_tpl": {"de": "\n== {message} ==\n", "en": "\n== {message} ==\n"},
     "progress_prefix": {"de": "Fortschritt:", "en": "Progress:"},
     "progress_suffix": {"de": "Komplett", "en": "Complete"},
+    "progress_eta": {"de": "Restzeit {eta}", "en": "ETA {eta}"},
+    "progress_summary": {"de": "{label}: {size} in {seconds} s ({rate}/s)", "en": "{label}: {size} in {seconds} s ({rate}/s)"},
 
     # Token Management
     "token_loaded_keyring": {"de": "GitHub Token aus dem System-Schlüsselbund geladen.", "en": "Loaded GitHub token from system keyring."},
@@ -89,7 +189,8 @@ TRANSLATIONS = {
     "branch_loading": {"de": "Lade verfügbare Branches...", "en": "Loading available branches..."},
     "branch_invalid_list": {"de": "Konnte keine gültige Branch-Liste von GitHub abrufen. Der Token ist möglicherweise ungültig. API-Antwort: {response_text}", "en": "Could not retrieve a valid branch list from GitHub. The token might be invalid. API response: {response_text}"},
     "branch_checking_artifacts": {"de": "Prüfe Branches auf verfügbare Artefakte...", "en": "Checking branches for available artifacts..."},
-    "branch_checking_branch": {"de": "  - Prüfe Branch '{name}'...", "en": "  - Checking branch '{name}'..."},
+    "branch_has_artifacts": {"de": "  - Branch '{name}': Build verfügbar", "en": "  - Branch '{name}': build available"},
+    "branch_no_artifacts": {"de": "  - Branch '{name}': kein erfolgreicher Build", "en": "  - Branch '{name}': no successful build"},
     "branch_no_artifacts_found": {"de": "Keine Branches mit erfolgreichen Builds und Artefakten gefunden.", "en": "No branches with successful builds and artifacts found."},
     "branch_select_prompt_header": {"de": "\nBitte wähle einen Branch aus, von dem installiert werden soll:", "en": "\nPlease select a branch to install from:"},
     "install_type_header": {"de": "Installationstyp auswählen", "en": "Select Installation Type"},
@@ -109,6 +210,18 @@ TRANSLATIONS = {
     "install_getting_artifacts": {"de": "Rufe Artefakt-Liste ab...", "en": "Fetching artifact list..."},
     "install_no_artifacts_url": {"de": "Konnte nicht beide Artefakt-URLs finden.", "en": "Could not find both artifact URLs."},
     "install_backing_up": {"de": "Sichere bestehende Installation nach {backup_dir}", "en": "Backing up existing installation to {backup_dir}"},
+    "install_staging": {"de": "Installiere nach {path}, die laufende Installation bleibt bis zum Umschalten unverändert.", "en": "Installing into {path}, the current installation stays untouched until the switchover."},
+    "install_activated": {"de": "Version {name} aktiviert.", "en": "Activated version {name}."},
+    "install_retiring_version": {"de": "Verschiebe alte Version {name} in die Backups.", "en": "Moving old version {name} to the backups."},
+    "install_delta_summary": {"de": "Delta-Update: {written} Datei(en) geschrieben ({size}), {unchanged} unverändert, {removed} entfernt.", "en": "Delta update: {written} file(s) written ({size}), {unchanged} unchanged, {removed} removed."},
+    "install_unsafe_member": {"de": "Unsicherer Pfad im Archiv: {name}", "en": "Unsafe path in archive: {name}"},
+    "install_digest_mismatch": {"de": "Prüfsumme von '{name}' stimmt nicht: erwartet {expected}, erhalten {actual}.", "en": "Checksum of '{name}' doesn't match: expected {expected}, got {actual}."},
+    "install_digest_verified": {"de": "Prüfsumme von '{name}' bestätigt.", "en": "Checksum of '{name}' verified."},
+    "install_cached_artifact": {"de": "Verwende '{name}' aus dem lokalen Artefakt-Cache.", "en": "Using '{name}' from the local artifact cache."},
+    "download_resuming": {"de": "Setze Download von '{name}' bei {size} MB fort...", "en": "Resuming download of '{name}' at {size} MB..."},
+    "download_retrying": {"de": "Download von '{name}' unterbrochen, neuer Versuch in {delay} s ({attempt}/{max_attempts})...", "en": "Download of '{name}' interrupted, retrying in {delay} s ({attempt}/{max_attempts})..."},
+    "download_changed": {"de": "'{name}' hat sich während des Downloads auf dem Server geändert.", "en": "'{name}' changed on the server during the download."},
+    "download_incomplete": {"de": "Download von '{name}' ist unvollständig.", "en": "Download of '{name}' is incomplete."},
     "install_downloading": {"de": "Lade '{name}' herunter...", "en": "Downloading '{name}'..."},
     "install_not_zip": {"de": "Heruntergeladene Datei für '{name}' ist kein gültiges ZIP-Archiv.", "en": "Downloaded file for '{name}' is not a valid ZIP archive."},
     "install_no_tar": {"de": "Kein .tar.gz-Archiv im '{name}'-Download gefunden.", "en": "No .tar.gz archive found in '{name}' download."},
@@ -116,6 +229,10 @@ TRANSLATIONS = {
     "install_path_saved": {"de": "Installationspfad in {path_file} gespeichert.", "en": "Installation path saved in {path_file}."},
     "sync_header": {"de": "Synchronisiere Plugins", "en": "Synchronizing Plugins"},
     "sync_running": {"de": "Führe '{command}' aus...", "en": "Running '{command}'..."},
+    "sync_skipped": {"de": "Weder yabridge noch die Plugin-Verzeichnisse haben sich seit der letzten Synchronisierung geändert, überspringe sie (--force-sync erzwingt sie).", "en": "Neither yabridge nor the plugin directories changed since the last sync, skipping it (use --force-sync to force it)."},
+    "sync_finished": {"de": "Synchronisierung abgeschlossen in {seconds} s.", "en": "Sync finished in {seconds} s."},
+    "sync_skipped_unknown": {"de": "Änderungen an den Plugin-Verzeichnissen können nicht erkannt werden (config.toml von yabridgectl nicht lesbar, tomllib braucht Python 3.11), überspringe die Synchronisierung (--force-sync erzwingt sie).", "en": "Changes to the plugin directories can't be detected (yabridgectl's config.toml can't be read, tomllib needs Python 3.11), skipping the sync (use --force-sync to force it)."},
+    "sync_fingerprint_time": {"de": "Änderungsprüfung von {count} Einträgen dauerte {seconds} s.", "en": "Checking {count} entries for changes took {seconds} s."},
     "sync_not_found": {"de": "yabridgectl wurde nach der Installation nicht gefunden.", "en": "yabridgectl not found after installation."},
 
     # PATH Management
@@ -132,6 +249,22 @@ TRANSLATIONS = {
     "backup_not_enough": {"de": "Nicht genügend alte Backups zum Aufräumen gefunden.", "en": "Not enough old backups found to prune."},
     "backup_deleting": {"de": "Lösche {count} alte Backup(s)...", "en": "Deleting {count} old backup(s)..."},
     "backup_deleted": {"de": "{name} gelöscht.", "en": "{name} deleted."},
+    "backup_deduplicated": {"de": "{files} Datei(en) gesichert, {linked} davon mit früheren Backups geteilt ({size} gespart).", "en": "Backed up {files} file(s), {linked} of them shared with earlier backups ({size} saved)."},
+    "backup_blobs_removed": {"de": "{count} nicht mehr benötigte Datei(en) ({size}) aus dem Backup-Speicher entfernt.", "en": "Removed {count} unreferenced file(s) ({size}) from the backup store."},
+    "backup_blob_missing": {"de": "Datei '{name}' fehlt im Backup und im Backup-Speicher.", "en": "File '{name}' is missing from both the backup and the backup store."},
+    "backup_archived": {"de": "Backup-Archiv erstellt ({size}, {files} Datei(en)).", "en": "Created backup archive ({size}, {files} file(s))."},
+    "backup_archive_failed": {"de": "Backup-Archiv konnte nicht erstellt werden, sichere stattdessen als Verzeichnis: {error}", "en": "Could not create the backup archive, keeping a directory backup instead: {error}"},
+    "backup_zstd_missing": {"de": "'zstd' wurde nicht gefunden, verwende stattdessen xz für das Backup.", "en": "'zstd' was not found, using xz for the backup instead."},
+    "backup_dry_run": {"de": "Probelauf: {count} Backup(s) würden gelöscht und etwa {size} freigegeben:", "en": "Dry run: {count} backup(s) would be deleted, freeing about {size}:"},
+    "backup_would_delete": {"de": "{name} ({reason})", "en": "{name} ({reason})"},
+    "backup_freed": {"de": "{size} freigegeben.", "en": "Freed {size}."},
+    "backup_policy_saved": {"de": "Aufbewahrungsregeln in {path} gespeichert, sie gelten ab jetzt auch nach jeder Installation.", "en": "Saved the retention policy to {path}, it is now also applied after every installation."},
+    "backup_policy": {"de": "Aufbewahrungsregeln: {policy}", "en": "Retention policy: {policy}"},
+    "retention_unselected": {"de": "von keiner Aufbewahrungsregel erfasst", "en": "not kept by any rule"},
+    "retention_too_old": {"de": "älter als {days} Tage", "en": "older than {days} days"},
+    "retention_over_budget": {"de": "über dem Speicherlimit von {size}", "en": "over the size budget of {size}"},
+    "backup_emptying_trash": {"de": "Entferne {count} Backup(s) aus dem Papierkorb...", "en": "Removing {count} backup(s) from the trash..."},
+    "backup_trash_label": {"de": "Löschen", "en": "Deleting"},
     "backup_delete_failed": {"de": "Konnte Backup {backup_dir} nicht löschen", "en": "Could not delete backup {backup_dir}"},
     "backup_prune_complete": {"de": "Aufräumen der Backups abgeschlossen.", "en": "Backup pruning complete."},
     "restore_header": {"de": "Backup wiederherstellen", "en": "Restore Backup"},
@@ -139,6 +272,9 @@ TRANSLATIONS = {
     "restore_available_header": {"de": "\nVerfügbare Backups (neueste zuerst):", "en": "\nAvailable backups (newest first):"},
     "restore_version_info": {"de": " (Version: {version}, Branch: {branch})", "en": " (Version: {version}, Branch: {branch})"},
     "restore_invalid_version": {"de": " (Ungültige Versionsdatei)", "en": " (Invalid version file)"},
+    "restore_backup_size": {"de": "[{size}, {files} Datei(en)]", "en": "[{size}, {files} file(s)]"},
+    "restore_staged_version": {"de": "[sofort umschaltbar]", "en": "[instant switch]"},
+    "restore_switching": {"de": "Schalte auf '{name}' um...", "en": "Switching to '{name}'..."},
     "restore_prompt": {"de": "Welches Backup wiederherstellen? (1-{count}): ", "en": "Which backup to restore? (1-{count}): "},
     "restore_restoring": {"de": "'{name}' wird wiederhergestellt...", "en": "Restoring '{name}'..."},
     "restore_pre_backup": {"de": "Sichere die aktuelle Installation nach {backup_dir}...", "en": "Backing up the current installation to {backup_dir}..."},
@@ -151,14 +287,60 @@ TRANSLATIONS = {
     # Main Logic / Arguments
     "argparse_description": {"de": "Ein Skript zum Herunterladen und Verwalten von Entwicklerversionen von yabridge.", "en": "A script to download and manage development versions of yabridge."},
     "argparse_install_path_help": {"de": "Benutzerdefinierter Installationspfad für yabridge. Überschreibt gespeicherte Pfade.", "en": "Custom installation path for yabridge. Overwrites saved path."},
+    "argparse_no_cache_help": {"de": "Die lokalen Caches für GitHub-API-Antworten und heruntergeladene Artefakte nicht verwenden.", "en": "Don't use the local caches for GitHub API responses and downloaded artifacts."},
+    "argparse_artifact_cache_size_help": {"de": "Maximale Größe des lokalen Artefakt-Caches in MB (Standard: 1024).", "en": "Maximum size of the local artifact cache in MB (default: 1024)."},
+    "argparse_backup_format_help": {"de": "Format neuer Backups: 'dir' (Verzeichnis mit Hardlinks, Standard), 'xz' oder 'zstd' (komprimiertes Archiv).", "en": "Format of new backups: 'dir' (hardlinked directory, default), 'xz' or 'zstd' (compressed archive)."},
+    "argparse_yes_help": {"de": "Stapelbetrieb: beantwortet alle Fragen mit Ja und wartet nie auf Eingaben (Token aus GITHUB_TOKEN oder dem Schlüsselbund).", "en": "Batch mode: answers every question with yes and never waits for input (token from GITHUB_TOKEN or the keyring)."},
+    "argparse_json_help": {"de": "Gibt das Ergebnis (Versionen, Zeiten, Bytes, Sync-Status) als JSON auf stdout aus; alle anderen Ausgaben gehen nach stderr.", "en": "Prints the result (versions, timings, bytes, sync status) as JSON on stdout; everything else goes to stderr."},
+    "argparse_channel_help": {"de": "Installiert aus diesem Kanal statt aus dem installierten ('dev' bleibt auf dem installierten Entwicklungs-Branch).", "en": "Installs from this channel instead of the installed one ('dev' stays on the installed development branch)."},
+    "argparse_branch_help": {"de": "Installiert den neuesten Build dieses Entwicklungs-Branches, ohne nachzufragen.", "en": "Installs the latest build of this development branch without asking."},
+    "argparse_channel_branch_conflict": {"de": "--branch kann nicht mit --channel stable kombiniert werden.", "en": "--branch can't be combined with --channel stable."},
+    "argparse_lock_timeout_help": {"de": "So lange auf einen anderen laufenden Updater warten, bevor abgebrochen wird (Standard: 600, 0: nicht warten).", "en": "How long to wait for another running updater before giving up (default: 600, 0: don't wait)."},
+    "argparse_profile_help": {"de": "Zeigt am Ende, wie viel Zeit, Anfragen und Bytes auf jede Phase entfallen.", "en": "Shows how much time, requests and bytes each phase took at the end."},
+    "argparse_metrics_log_help": {"de": "Hängt die Messwerte dieses Laufs als JSON-Zeile an ~/.config/yabridge-updater/metrics.jsonl an.", "en": "Appends the metrics of this run as a JSON line to ~/.config/yabridge-updater/metrics.jsonl."},
+    "argparse_force_sync_help": {"de": "Führt 'yabridgectl sync' auch dann aus, wenn sich seit der letzten Synchronisierung nichts geändert hat.", "en": "Runs 'yabridgectl sync' even if nothing changed since the last sync."},
+    "argparse_backup_level_help": {"de": "Kompressionsstufe für Backup-Archive (xz: 0-9, zstd: 1-22).", "en": "Compression level for backup archives (xz: 0-9, zstd: 1-22)."},
+    "argparse_backup_level_invalid": {"de": "Die Kompressionsstufe für {format} muss zwischen {min} und {max} liegen.", "en": "The compression level for {format} must be between {min} and {max}."},
+    "argparse_artifact_cache_age_help": {"de": "Artefakte, die länger als so viele Tage nicht verwendet wurden, aus dem Cache entfernen (Standard: 30).", "en": "Remove artifacts from the cache that haven't been used for this many days (default: 30)."},
     "argparse_commands_title": {"de": "Befehle", "en": "Commands"},
     "argparse_update_help": {"de": "Sucht nach Updates und installiert sie (Standardaktion).", "en": "Checks for updates and installs them (default action)."},
     "argparse_interactive_help": {"de": "Erzwingt die interaktive Auswahl eines Branches.", "en": "Forces interactive branch selection."},
+    "argparse_discovery_help": {"de": "Branch-Suche: 'runs' liest die Liste erfolgreicher Workflow-Läufe seitenweise (Standard), 'probe' fragt jeden Branch einzeln ab.", "en": "Branch discovery: 'runs' pages through the list of successful workflow runs (default), 'probe' queries every branch individually."},
+    "argparse_staged_help": {"de": "Gestaffelte Installation: jede Version in ein eigenes Verzeichnis installieren und per Symlink atomar umschalten (bleibt danach aktiv).", "en": "Staged installation: install every version into its own directory and switch over atomically through a symlink (stays enabled afterwards)."},
+    "argparse_delta_help": {"de": "Delta-Update: nur geänderte Dateien schreiben, unveränderte bleiben erhalten (bzw. werden per Hardlink übernommen).", "en": "Delta update: only write files that changed, unchanged files are kept (or reused through hardlinks)."},
+    "argparse_jobs_help": {"de": "Maximale Anzahl paralleler GitHub-Anfragen bei der Branch-Suche (Standard: 8).", "en": "Maximum number of parallel GitHub requests while probing branches (default: 8)."},
     "argparse_sync_help": {"de": "Führt 'yabridgectl sync' aus, um Plugins zu synchronisieren.", "en": "Runs 'yabridgectl sync' to synchronize plugins."},
     "argparse_status_help": {"de": "Zeigt die aktuell installierte Version und den Pfad an.", "en": "Displays the currently installed version and path."},
     "argparse_restore_help": {"de": "Stellt eine frühere Version aus einem Backup wieder her.", "en": "Restores a previous version from a backup."},
     "argparse_prune_help": {"de": "Löscht alte Backups.", "en": "Deletes old backups."},
-    "argparse_keep_help": {"de": "Anzahl der zu behaltenden Backups (Standard: 5).", "en": "Number of backups to keep (default: 5)."},
+    "argparse_keep_help": {"de": "Anzahl der zu behaltenden neuesten Backups (Standard: 5, wenn keine andere Regel angegeben ist).", "en": "Number of most recent backups to keep (default: 5 if no other rule is given)."},
+    "argparse_max_size_help": {"de": "Backups vom ältesten an löschen, bis alle zusammen höchstens so viele MB belegen.", "en": "Delete backups, oldest first, until all of them together take up at most this many MB."},
+    "argparse_max_age_help": {"de": "Backups löschen, die älter als so viele Tage sind (das neueste Backup bleibt immer erhalten).", "en": "Delete backups older than this many days (the most recent backup is always kept)."},
+    "argparse_keep_per_branch_help": {"de": "Die neuesten N Backups jedes Branches behalten.", "en": "Keep the N most recent backups of every branch."},
+    "argparse_keep_daily_help": {"de": "Für die letzten N Tage mit Backups jeweils das neueste behalten.", "en": "Keep the most recent backup of each of the last N days that have backups."},
+    "argparse_keep_weekly_help": {"de": "Für die letzten N Wochen mit Backups jeweils das neueste behalten.", "en": "Keep the most recent backup of each of the last N weeks that have backups."},
+    "argparse_keep_monthly_help": {"de": "Für die letzten N Monate mit Backups jeweils das neueste behalten.", "en": "Keep the most recent backup of each of the last N months that have backups."},
+    "argparse_dry_run_help": {"de": "Nur anzeigen, welche Backups gelöscht würden und wie viel Platz das freigibt.", "en": "Only show which backups would be deleted and how much space that frees."},
+    "argparse_save_policy_help": {"de": "Die angegebenen Regeln speichern und nach jeder Installation automatisch anwenden.", "en": "Save the given rules and apply them automatically after every installation."},
+    "argparse_check_help": {"de": "Prüft nur, ob ein Update verfügbar ist (Exit-Code 0: aktuell, 10: Update verfügbar, 1: Fehler).", "en": "Only checks whether an update is available (exit code 0: up to date, 10: update available, 1: error)."},
+    "argparse_check_ttl_help": {"de": "So lange (in Sekunden) wird das zwischengespeicherte Ergebnis verwendet, bevor GitHub erneut gefragt wird (Standard: 900).", "en": "How long (in seconds) the cached result is used before GitHub is asked again (default: 900)."},
+    "argparse_check_quiet_help": {"de": "Gibt nichts aus, nur der Exit-Code zählt.", "en": "Prints nothing, only the exit code matters."},
+    "argparse_daemon_help": {"de": "Prüft regelmäßig auf Updates und lädt sie im Voraus herunter, damit 'update' sie nur noch aktivieren muss.", "en": "Periodically checks for updates and downloads them ahead of time, so 'update' only has to activate them."},
+    "argparse_daemon_once_help": {"de": "Nur eine Runde ausführen (für den systemd-Timer).", "en": "Run a single round only (used by the systemd timer)."},
+    "argparse_daemon_interval_help": {"de": "Minuten zwischen zwei Prüfungen (Standard: 360).", "en": "Minutes between two checks (default: 360)."},
+    "argparse_daemon_jitter_help": {"de": "Zufällige zusätzliche Wartezeit in Sekunden, damit nicht alle Rechner gleichzeitig fragen (Standard: 600).", "en": "Random extra delay in seconds, so that not all machines ask at the same time (default: 600)."},
+    "argparse_daemon_install_systemd_help": {"de": "Legt einen systemd-User-Service mit Timer an, der 'daemon --once' regelmäßig ausführt.", "en": "Creates a systemd user service and timer that run 'daemon --once' periodically."},
+    "argparse_daemon_remove_systemd_help": {"de": "Deaktiviert und entfernt den systemd-Service und -Timer wieder.", "en": "Disables and removes the systemd service and timer again."},
+    "argparse_update_all_help": {"de": "Aktualisiert alle mit 'installs add' eingetragenen Installationen.", "en": "Updates all installations registered with 'installs add'."},
+    "argparse_all_conflict": {"de": "--all kann nicht mit --channel, --branch oder --interactive kombiniert werden, der Branch steht pro Installation in installs.json.", "en": "--all can't be combined with --channel, --branch or --interactive, the branch of each installation is set in installs.json."},
+    "argparse_daemon_no_cache": {"de": "Der Daemon lädt Builds in den Artefakt-Cache und kann nicht mit --no-cache laufen.", "en": "The daemon downloads builds into the artifact cache and can't run with --no-cache."},
+    "argparse_installs_help": {"de": "Verwaltet mehrere benannte Installationen für 'update --all'.", "en": "Manages several named installations for 'update --all'."},
+    "argparse_installs_list_help": {"de": "Zeigt alle eingetragenen Installationen (Standard).", "en": "Lists all registered installations (default)."},
+    "argparse_installs_add_help": {"de": "Trägt eine Installation unter einem Namen ein.", "en": "Registers an installation under a name."},
+    "argparse_installs_branch_help": {"de": "Branch der Installation ('stable' oder ein Entwicklungs-Branch), Standard: der dort installierte.", "en": "Branch of the installation ('stable' or a development branch), default: the one installed there."},
+    "argparse_installs_remove_help": {"de": "Entfernt eine Installation aus der Liste (die Dateien bleiben erhalten).", "en": "Removes an installation from the list (its files are kept)."},
+    "argparse_verify_help": {"de": "Prüft die installierten Dateien gegen die SHA-256-Prüfsummen im Manifest.", "en": "Checks the installed files against the SHA-256 digests in the manifest."},
+    "argparse_verify_jobs_help": {"de": "Anzahl paralleler Prozesse (Standard: Anzahl der CPU-Kerne).", "en": "Number of parallel processes (default: number of CPU cores)."},
     "argparse_self_update_help": {"de": "Aktualisiert dieses Skript auf die neueste Version von GitHub.", "en": "Updates this script to the latest version from GitHub."},
     "argparse_token_help": {"de": "Verwaltet den gespeicherten GitHub-Token.", "en": "Manages the stored GitHub token."},
     "argparse_token_clear_help": {"de": "Löscht den gespeicherten GitHub-Token.", "en": "Deletes the stored GitHub token."},
@@ -173,6 +355,8 @@ TRANSLATIONS = {
     "status_installed_branch": {"de": "  Installierter Branch: ", "en": "  Installed branch: "},
     "status_installed_version": {"de": "  Installierte Version (SHA): ", "en": "  Installed version (SHA): "},
     "status_version_corrupt": {"de": "Lokale .version-Datei ist korrupt.", "en": "Local .version file is corrupt."},
+    "status_staged": {"de": "  Aktive Version (gestaffelt): ", "en": "  Active version (staged): "},
+    "status_staged_versions": {"de": "  Vorgehaltene Versionen: ", "en": "  Staged versions: "},
     "status_unknown_version": {"de": "Unbekannt (keine .version-Datei gefunden)", "en": "Unknown (no .version file found)"},
     "updater_header": {"de": "Yabridge Updater", "en": "Yabridge Updater"},
     "interactive_forced": {"de": "Interaktiver Modus wird erzwungen.", "en": "Forcing interactive mode."},
@@ -181,6 +365,8 @@ TRANSLATIONS = {
     "update_available": {"de": "Update von {local_sha} auf {remote_sha} für Branch '{branch}' verfügbar.", "en": "Update from {local_sha} to {remote_sha} available for branch '{branch}'."},
     "stable_update_available": {"de": "Update von Version {local_sha} auf {remote_sha} verfügbar.", "en": "Update from version {local_sha} to {remote_sha} available."},
     "install_now_prompt": {"de": "Jetzt installieren? (J/n)", "en": "Install now? (Y/n)"},
+    "batch_target_required": {"de": "Es ist keine Version installiert. Im Stapelbetrieb muss --channel stable oder --branch angegeben werden.", "en": "Nothing is installed. In batch mode, --channel stable or --branch is required."},
+    "batch_branch_required": {"de": "Es ist kein Entwicklungs-Branch installiert, --channel dev braucht daher --branch.", "en": "No development branch is installed, so --channel dev needs --branch."},
     "update_aborted": {"de": "Update abgebrochen.", "en": "Update aborted."},
     "already_latest": {"de": "Du hast bereits die aktuellste Version.", "en": "You already have the latest version."},
     "no_local_version_interactive": {"de": "Keine lokale Version gefunden oder --interactive gesetzt. Starte interaktiven Modus...", "en": "No local version found or --interactive set. Starting interactive mode..."},
@@ -192,6 +378,51 @@ TRANSLATIONS = {
     "self_update_restarting": {"de": "Update erfolgreich. Starte Skript neu...", "en": "Update successful. Restarting script..."},
 
     # Error Handling
+    "check_update_available": {"de": "Update verfügbar für {branch}: {local} -> {remote}", "en": "Update available for {branch}: {local} -> {remote}"},
+    "check_up_to_date": {"de": "{branch} ist aktuell.", "en": "{branch} is up to date."},
+    "check_not_installed": {"de": "Unter {path} ist keine Version mit .version-Datei installiert.", "en": "No version with a .version file is installed at {path}."},
+    "check_busy": {"de": "Ein Update läuft gerade.", "en": "An update is in progress."},
+    "check_failed": {"de": "Die Update-Prüfung ist fehlgeschlagen.", "en": "The update check failed."},
+    "daemon_up_to_date": {"de": "{branch} ist aktuell, nichts herunterzuladen.", "en": "{branch} is up to date, nothing to download."},
+    "daemon_prefetched": {"de": "{branch} {version} ist heruntergeladen, 'update' installiert es ohne Download.", "en": "{branch} {version} is downloaded, 'update' will install it without downloading."},
+    "daemon_busy": {"de": "Ein anderer Lauf des Updaters ist aktiv, diese Runde wird übersprungen.", "en": "Another updater run is active, skipping this round."},
+    "daemon_round_failed": {"de": "Die Update-Prüfung ist fehlgeschlagen, nächster Versuch bald.", "en": "The update check failed, retrying soon."},
+    "daemon_rate_limited": {"de": "Das GitHub-Ratenlimit ist fast aufgebraucht, warte {minutes} Minuten.", "en": "The GitHub rate limit is almost used up, waiting {minutes} minutes."},
+    "daemon_sleeping": {"de": "Nächste Prüfung in {minutes} Minuten.", "en": "Next check in {minutes} minutes."},
+    "daemon_systemd_header": {"de": "systemd-Timer", "en": "systemd Timer"},
+    "daemon_systemd_written": {"de": "Service und Timer wurden nach {path} geschrieben.", "en": "Service and timer written to {path}."},
+    "daemon_systemd_enable_prompt": {"de": "Timer jetzt aktivieren? (j/N)", "en": "Enable the timer now? (y/N)"},
+    "daemon_systemd_enabled": {"de": "Timer aktiviert.", "en": "Timer enabled."},
+    "daemon_systemd_enable_hint": {"de": "Aktivieren mit: {command}", "en": "Enable it with: {command}"},
+    "daemon_systemd_removed": {"de": "Service und Timer wurden entfernt.", "en": "Service and timer removed."},
+    "lock_waiting": {"de": "{path} ist von Prozess {pid} ('{command}') gesperrt, warte...", "en": "{path} is locked by process {pid} ('{command}'), waiting..."},
+    "lock_timeout": {"de": "{path} war nach {seconds} s immer noch gesperrt.", "en": "{path} was still locked after {seconds} s."},
+    "installs_header": {"de": "Installationen", "en": "Installations"},
+    "installs_none": {"de": "Es sind keine Installationen eingetragen. Trage sie mit 'installs add NAME PFAD --branch BRANCH' ein.", "en": "No installations are registered. Add them with 'installs add NAME PATH --branch BRANCH'."},
+    "installs_added": {"de": "Installation '{name}' ({path}, {branch}) eingetragen.", "en": "Registered installation '{name}' ({path}, {branch})."},
+    "installs_removed": {"de": "Installation '{name}' ausgetragen.", "en": "Removed installation '{name}'."},
+    "installs_shared_parent": {"de": "{first} und {second} liegen im selben Verzeichnis und würden sich Backups und Versionen teilen. Jede Installation braucht ein eigenes Verzeichnis, z. B. ~/.local/share/yabridge-dev/yabridge.", "en": "{first} and {second} are in the same directory and would share their backups and versions. Every installation needs a directory of its own, e.g. ~/.local/share/yabridge-dev/yabridge."},
+    "installs_unknown": {"de": "Es gibt keine Installation namens '{name}'.", "en": "There is no installation called '{name}'."},
+    "installs_branch_required": {"de": "Unter {path} ist nichts installiert, bitte --branch angeben.", "en": "Nothing is installed at {path}, please pass --branch."},
+    "installs_plan": {"de": "{name} ({branch}): {old} -> {new} {state}", "en": "{name} ({branch}): {old} -> {new} {state}"},
+    "installs_state_current": {"de": "(aktuell)", "en": "(up to date)"},
+    "installs_state_update": {"de": "(wird aktualisiert)", "en": "(will be updated)"},
+    "installs_confirm": {"de": "{count} Installation(en) jetzt aktualisieren? (J/n)", "en": "Update {count} installation(s) now? (Y/n)"},
+    "installs_linked": {"de": "{path} mit Hardlinks auf {source} installiert.", "en": "Installed {path} with hardlinks to {source}."},
+    "installs_failed": {"de": "Die Installation '{name}' konnte nicht aktualisiert werden.", "en": "The installation '{name}' couldn't be updated."},
+    "verify_header": {"de": "Installation überprüfen", "en": "Verifying Installation"},
+    "verify_no_manifest": {"de": "Die Installation hat kein Datei-Manifest in .version. Installiere sie einmal neu, damit eines angelegt wird.", "en": "The installation has no file manifest in .version. Reinstall it once to create one."},
+    "verify_checking": {"de": "Prüfe {count} Datei(en) mit {workers} Prozess(en)...", "en": "Checking {count} file(s) with {workers} process(es)..."},
+    "verify_missing": {"de": "Fehlt: {name}", "en": "Missing: {name}"},
+    "verify_modified": {"de": "Verändert oder beschädigt: {name}", "en": "Modified or corrupted: {name}"},
+    "verify_unexpected": {"de": "Nicht im Manifest: {name}", "en": "Not in the manifest: {name}"},
+    "verify_ok": {"de": "Alle {count} Datei(en) sind unverändert ({seconds} s).", "en": "All {count} file(s) are intact ({seconds} s)."},
+    "verify_failed": {"de": "{count} Datei(en) fehlen oder wurden verändert. Ein Update oder 'restore' stellt die Installation wieder her.", "en": "{count} file(s) are missing or modified. An update or 'restore' will repair the installation."},
+    "profile_header": {"de": "Laufzeitprofil", "en": "Profile"},
+    "profile_columns": {"de": "Phase|Zeit|Anteil|Anfragen|Geladen|Geschrieben", "en": "Phase|Time|Share|Requests|Downloaded|Written"},
+    "profile_total": {"de": "Gesamt", "en": "Total"},
+    "profile_log_written": {"de": "Messwerte angehängt an {path}", "en": "Metrics appended to {path}"},
+    "error_locked": {"de": "Ein anderer Lauf des Updaters ist noch aktiv.", "en": "Another updater run is still active."},
     "error_network": {"de": "Ein Netzwerkfehler bei der Kommunikation mit GitHub ist aufgetreten.", "en": "A network error occurred while communicating with GitHub."},
     "error_subprocess": {"de": "Ein externer Befehl (z.B. yabridgectl) ist fehlgeschlagen.", "en": "An external command (e.g., yabridgectl) failed."},
     "error_file_io": {"de": "Ein Fehler beim Lesen, Schreiben oder Entpacken von Dateien ist aufgetreten.", "en": "An error occurred while reading, writing, or extracting files."},
@@ -218,10 +449,92 @@ class C:
 
 # --- Global State ---
 _rate_limit_warning_shown = False
+# Remaining GitHub API requests and the reset time, as reported by the last response
+_rate_limit_remaining = None
+_rate_limit_reset = None
+# Set by --yes: every question is answered with yes and nothing else is asked
+_assume_yes = False
+# Structured outcome of the run, printed as JSON with --json
+run_result = {}
 
 # --- Helper Functions ---
 
 
+def read_lock_owner(lock_file):
+    """Returns who holds an exclusive lock (pid, host, command, since), or None if unknown."""
+    try:
+        return json.loads(lock_file.read_text())
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def try_lock(lock_file, shared=False):
+    """Tries to `flock` `lock_file` without waiting and returns the open file holding the lock, or None.
+
+    The lock is released when the file is closed, at the latest when the
+    process exits, so a crashed holder never leaves a lock behind. Exclusive
+    holders write their pid and host into the file; that record is only
+    informational and may name a holder that has exited since.
+    """
+    lock_file.parent.mkdir(parents=True, exist_ok=True)
+    while True:
+        f = open(lock_file, "a+")
+        try:
+            fcntl.flock(f, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.close()
+            return None
+        # The file may have been removed (uninstall) or replaced since it was
+        # opened, a lock on the old inode wouldn't exclude anyone
+        try:
+            if os.fstat(f.fileno()).st_ino == os.stat(lock_file).st_ino:
+                break
+        except FileNotFoundError:
+            pass
+        f.close()
+    if not shared:
+        f.truncate(0)
+        f.write(json.dumps({"pid": os.getpid(), "host": socket.gethostname(),
+                            "command": " ".join(sys.argv[1:]), "since": time.time()}))
+        f.flush()
+    return f
+
+
+def hold_lock(lock_file, shared=False, timeout=LOCK_TIMEOUT_SECONDS):
+    """Waits up to `timeout` seconds (None: forever) for a lock and returns the open file holding it."""
+    f = try_lock(lock_file, shared)
+    if f is not None:
+        return f
+    if timeout == 0:
+        raise TimeoutError(get_string("lock_timeout", path=lock_file, seconds=0))
+    owner = read_lock_owner(lock_file) or {}
+    print_info(get_string("lock_waiting", path=lock_file, pid=owner.get("pid", "?"),
+               command=owner.get("command") or "?"))
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while f is None:
+        if deadline is not None and time.monotonic() >= deadline:
+            raise TimeoutError(get_string("lock_timeout", path=lock_file, seconds=timeout))
+        time.sleep(LOCK_POLL_INTERVAL)
+        f = try_lock(lock_file, shared)
+    return f
+
+
+def install_lock_path(yabridge_dir):
+    """The lock of an installation lives next to it, so it survives moving the installation into a backup."""
+    return yabridge_dir.parent / f".{yabridge_dir.name}.lock"
+
+
+def load_requests():
+    """Imports `requests` on first use, returns False if it isn't installed."""
+    global requests
+    if requests is None:
+        try:
+            import requests
+        except ImportError:
+            return False
+    return True
+
+
 def print_error(message, details=""):
     """Prints an error message to stderr."""
     print(f"{C.FAIL}{get_string('error_prefix')}{message}{C.ENDC}", file=sys.stderr)
@@ -250,16 +563,232 @@ def print_header(message):
     print(f"{C.HEADER}{get_string('header_tpl', message=message)}{C.ENDC}")
 
 
-def print_progress_bar(iteration, total, prefix='', suffix='', decimals=1, length=50, fill='█'):
-    """Call in a loop to create terminal progress bar."""
+def confirm(prompt, default=False):
+    """Asks a yes/no question, in batch mode (--yes) the answer is always yes."""
+    if _assume_yes:
+        return True
+    answers = ["j", "ja", "y", "yes"] + ([""] if default else [])
+    return input(f"{C.WARNING}{prompt}{C.ENDC} ").lower().strip() in answers
+
+
+def format_progress_bar(iteration, total, prefix='', suffix='', decimals=1, length=50, fill='█'):
+    """Returns a single terminal progress bar line."""
     if total == 0:
         total = 1
     percent = ("{0:." + str(decimals) + "f}").format(100 *
                                                      (iteration / float(total)))
     filled_length = int(length * iteration // total)
     bar = fill * filled_length + '-' * (length - filled_length)
-    sys.stdout.write(f'\r{prefix} |{bar}| {percent}% {suffix}')
-    sys.stdout.flush()
+    return f'{prefix} |{bar}| {percent}% {suffix}'
+
+
+def format_size(num_bytes):
+    return f"{num_bytes / (1024 * 1024):.1f} MB"
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}:{seconds:02d}"
+
+
+# --- Profiling ---
+
+
+class Profiler:
+    """Lightweight timing spans for the phases of a run.
+
+    `span(name)` times a block (or, as a decorator, a function). Counters
+    added with `count()` (HTTP requests, bytes downloaded and written) are
+    attributed to the innermost open span of the current thread and every
+    span around it. Spans opened in worker threads hang below the span that
+    is open in the main thread.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.spans = []
+        self.totals = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._local.stack = self._main_stack = []
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _current(self):
+        stack = self._stack()
+        if stack:
+            return stack[-1]
+        return self._main_stack[-1] if self._main_stack else None
+
+    @contextlib.contextmanager
+    def span(self, name):
+        parent = self._current()
+        record = {"name": name, "depth": parent["depth"] + 1 if parent else 0,
+                  "parent": parent, "seconds": 0.0, "counters": {}}
+        with self._lock:
+            self.spans.append(record)
+        stack = self._stack()
+        stack.append(record)
+        started = time.monotonic()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.monotonic() - started
+            stack.remove(record)
+
+    def count(self, counter, amount=1):
+        with self._lock:
+            self.totals[counter] = self.totals.get(counter, 0) + amount
+            record = self._current()
+            while record is not None:
+                record["counters"][counter] = record["counters"].get(counter, 0) + amount
+                record = record["parent"]
+
+    def report(self):
+        """Prints the spans as an indented table."""
+        total = time.monotonic() - self.started
+        print_header(get_string("profile_header"))
+        columns = get_string("profile_columns").split("|")
+        print(f"{C.BOLD}{columns[0]:<36}{columns[1]:>9}{columns[2]:>8}{columns[3]:>10}"
+              f"{columns[4]:>12}{columns[5]:>12}{C.ENDC}")
+        rows = [("  " * record["depth"] + record["name"], record["seconds"], record["counters"])
+                for record in self.spans]
+        rows.append((get_string("profile_total"), total, self.totals))
+        for name, seconds, counters in rows:
+            share = 100 * seconds / total if total else 0
+            print(f"{name[:35]:<36}{seconds:>8.2f}s{share:>7.1f}%{counters.get('requests', 0):>10}"
+                  f"{format_size(counters.get('bytes_downloaded', 0)):>12}"
+                  f"{format_size(counters.get('bytes_written', 0)):>12}")
+
+    def summary(self):
+        """Returns the total time, counters and spans as plain data."""
+        return {"seconds": round(time.monotonic() - self.started, 3), "counters": self.totals,
+                "spans": [{"name": record["name"], "depth": record["depth"],
+                           "seconds": round(record["seconds"], 3), **record["counters"]}
+                          for record in self.spans]}
+
+    def write_log(self, log_file, command):
+        """Appends this run as one JSON line to `log_file`."""
+        entry = {"time": datetime.datetime.now().isoformat(timespec="seconds"),
+                 "command": command, **self.summary()}
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        with log_file.open("a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def finish(self, command, show=False, log_file=None):
+        if show:
+            self.report()
+        if log_file is not None:
+            self.write_log(log_file, command)
+            print_info(get_string("profile_log_written", path=f"{C.OKCYAN}{log_file}{C.ENDC}"))
+
+
+profiler = Profiler()
+
+
+class ProgressDisplay:
+    """Thread-safe progress bars with one terminal line per download.
+
+    All lines are redrawn in place, so concurrent downloads don't interleave
+    their output. Redraws are throttled to one every `interval` seconds (plus
+    one when a download finishes), so the download loop doesn't spend its time
+    formatting strings. When the output is not a terminal nothing is drawn at
+    all, only a one-line summary per finished download is printed.
+    """
+
+    def __init__(self, labels, stream=None, interval=PROGRESS_REDRAW_INTERVAL):
+        self.labels = list(labels)
+        self.stream = stream or sys.stdout
+        self.interval = interval
+        try:
+            self.interactive = self.stream.isatty()
+        except (AttributeError, ValueError):
+            self.interactive = False
+        self._state = {label: {"done": 0, "total": 0, "start": time.monotonic(), "end": None}
+                       for label in self.labels}
+        self._width = max((len(label) for label in self.labels), default=0)
+        self._lock = threading.Lock()
+        self._drawn = False
+        self._last_draw = 0.0
+
+    def set_total(self, label, total):
+        with self._lock:
+            self._state[label]["total"] = total
+            self._state[label]["start"] = time.monotonic()
+            self._render()
+
+    def update(self, label, done):
+        state = self._state[label]
+        state["done"] = done
+        if not self.interactive:
+            return
+        if time.monotonic() - self._last_draw < self.interval:
+            return
+        with self._lock:
+            self._render()
+
+    def finish(self, label):
+        """Marks a download as complete and draws (or prints) its final state."""
+        with self._lock:
+            state = self._state[label]
+            if state["end"] is not None:
+                return
+            state["end"] = time.monotonic()
+            if self.interactive:
+                self._render()
+            else:
+                elapsed = max(state["end"] - state["start"], 1e-6)
+                self.stream.write(get_string("progress_summary", label=label, size=format_size(state["done"]),
+                                             seconds=f"{elapsed:.1f}",
+                                             rate=format_size(state["done"] / elapsed)) + "\n")
+                self.stream.flush()
+
+    def write(self, line, file=None):
+        """Prints a message above the progress bars (or to `file`, e.g. stderr) without breaking them."""
+        file = file or self.stream
+        with self._lock:
+            if self.interactive and self._drawn:
+                self.stream.write(f"\033[{len(self.labels)}F\033[J")
+                self.stream.flush()
+                self._drawn = False
+            file.write(line + "\n")
+            file.flush()
+            if self.interactive:
+                self._render()
+
+    def _line(self, label):
+        state = self._state[label]
+        done, total = state["done"], state["total"]
+        elapsed = max((state["end"] or time.monotonic()) - state["start"], 1e-6)
+        rate = done / elapsed
+        prefix = f"{C.OKGREEN}{get_string('progress_prefix')}{C.ENDC} {label:<{self._width}}"
+        if state["end"] is not None:
+            suffix = f"{get_string('progress_suffix')} {format_size(done)} ({format_size(rate)}/s)"
+        elif total > 0:
+            eta = (total - done) / rate if rate > 0 else 0
+            suffix = f"{format_size(done)}/{format_size(total)} {format_size(rate)}/s " + \
+                get_string("progress_eta", eta=format_duration(eta))
+        else:
+            # Without a size there is nothing to draw a bar for
+            return f"{prefix} {format_size(done)} {format_size(rate)}/s"
+        if total == 0:
+            total = done
+        return format_progress_bar(done, total, prefix=prefix, suffix=suffix, length=40)
+
+    def _render(self):
+        if not self.labels or not self.interactive:
+            return
+        if self._drawn:
+            # Jump back to the first of our lines
+            self.stream.write(f"\033[{len(self.labels)}F")
+        self.stream.write("".join(
+            f"\033[2K{self._line(label)}\n" for label in self.labels))
+        self.stream.flush()
+        self._drawn = True
+        self._last_draw = time.monotonic()
 
 
 def check_command_exists(cmd):
@@ -269,7 +798,10 @@ def check_command_exists(cmd):
 
 def check_rate_limit(response):
     """Checks GitHub API rate limit and prints a warning if it's low."""
-    global _rate_limit_warning_shown
+    global _rate_limit_warning_shown, _rate_limit_remaining, _rate_limit_reset
+    if 'X-RateLimit-Remaining' in response.headers:
+        _rate_limit_remaining = int(response.headers['X-RateLimit-Remaining'])
+        _rate_limit_reset = int(response.headers.get('X-RateLimit-Reset', 0))
     if _rate_limit_warning_shown:
         return
     if 'X-RateLimit-Remaining' in response.headers:
@@ -282,6 +814,837 @@ def check_rate_limit(response):
                 f"Only {remaining} GitHub API requests left. Limit resets at: {reset_datetime.strftime('%Y-%m-%d %H:%M:%S')}")
             _rate_limit_warning_shown = True
 
+# --- HTTP Client ---
+
+
+class ResponseCache:
+    """On-disk cache for GitHub API responses, used for conditional requests.
+
+    Every entry is a small JSON file named after a hash of the URL (and the token,
+    so different accounts never share entries) holding the ETag, Last-Modified and
+    body of the last 200 response. File modification times double as LRU order:
+    hits touch the file, and the oldest entries are evicted once the cache grows
+    beyond `max_bytes`.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir or HTTP_CACHE_DIR
+        self.max_bytes = max_bytes
+
+    def _entry_path(self, url, auth):
+        key = hashlib.sha256(f"{auth or ''}\n{url}".encode()).hexdigest()
+        return self.cache_dir / f"{key}.json"
+
+    def load(self, url, auth=None):
+        entry_path = self._entry_path(url, auth)
+        try:
+            entry = json.loads(entry_path.read_text())
+        except (OSError, json.JSONDecodeError):
+            return None
+        if entry.get("url") != url:
+            return None
+        return entry
+
+    def touch(self, url, auth=None):
+        try:
+            os.utime(self._entry_path(url, auth))
+        except OSError:
+            pass
+
+    def store(self, url, auth, response):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        entry = {"url": url, "etag": etag, "last_modified": last_modified,
+                 "body": response.text}
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            entry_path = self._entry_path(url, auth)
+            tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(entry))
+            os.replace(tmp_path, entry_path)
+            self.evict()
+        except OSError:
+            # The cache is only an optimization, never fail a request because of it
+            pass
+
+    def evict(self):
+        """Removes the least recently used entries until the cache fits into max_bytes."""
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".json"):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError:
+                pass
+
+
+class GitHubClient:
+    """A shared, pooled HTTP client for all GitHub requests.
+
+    Keeps one `requests.Session` alive for the whole run so that connections to
+    api.github.com and the download hosts are reused. 5xx responses are retried
+    with exponential backoff by urllib3, secondary rate limits (403/429 with
+    `Retry-After`) are waited out in `get()`. API responses are revalidated with
+    `If-None-Match` / `If-Modified-Since` against the `ResponseCache`, a 304 is
+    answered from the cache (and doesn't count against the rate limit).
+    Anything providing a compatible `get(url, **kwargs)` and `repo_url(path)`
+    can be used in its place.
+    """
+
+    def __init__(self, token=None, api_url=None, timeout=HTTP_TIMEOUT,
+                 pool_size=HTTP_POOL_SIZE, max_retries=HTTP_MAX_RETRIES, backoff_factor=HTTP_BACKOFF_FACTOR,
+                 cache=None):
+        load_requests()
+        from urllib3.util.retry import Retry
+
+        self.api_url = api_url or GITHUB_API_URL
+        self.cache = cache
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.session = requests.Session()
+        self.session.headers.update({"Accept": "application/vnd.github.v3+json",
+                                     "User-Agent": UPDATER_REPO})
+        retry = Retry(total=max_retries, backoff_factor=backoff_factor,
+                      status_forcelist=[500, 502, 503, 504], allowed_methods=["GET", "HEAD"],
+                      respect_retry_after_header=True, raise_on_status=False)
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if token:
+            self.set_token(token)
+
+    def set_token(self, token):
+        self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def repo_url(self, path):
+        """Returns the API URL for a path below the yabridge repository."""
+        return f"{self.api_url}/repos/{REPO}/{path}"
+
+    def _rate_limit_delay(self, response, attempt):
+        """Returns how long to wait before retrying a rate-limited response, or None."""
+        if response.status_code not in (403, 429):
+            return None
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            delay = int(retry_after)
+        elif response.headers.get("X-RateLimit-Remaining") == "0":
+            reset = int(response.headers.get("X-RateLimit-Reset", 0))
+            delay = reset - int(time.time())
+        elif "secondary rate limit" in response.text.lower():
+            delay = self.backoff_factor * (2 ** attempt) * 10
+        else:
+            return None
+        if delay > HTTP_MAX_RATE_LIMIT_WAIT:
+            # A primary rate limit can take up to an hour to reset; give up instead
+            return None
+        return max(delay, 1)
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        cacheable = (self.cache is not None and not kwargs.get("stream")
+                     and url.startswith(self.api_url))
+        if not cacheable:
+            return self._get(url, **kwargs)
+
+        auth = self.session.headers.get("Authorization")
+        entry = self.cache.load(url, auth)
+        if entry:
+            conditional = {}
+            if entry.get("etag"):
+                conditional["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                conditional["If-Modified-Since"] = entry["last_modified"]
+            kwargs["headers"] = {**kwargs.get("headers", {}), **conditional}
+        response = self._get(url, **kwargs)
+        if response.status_code == 304 and entry:
+            # Serve the body from the cache but keep the fresh headers (rate limit info)
+            response.status_code = 200
+            response._content = entry["body"].encode("utf-8")
+            response.encoding = "utf-8"
+            response.from_cache = True
+            profiler.count("cache_hits")
+            self.cache.touch(url, auth)
+        elif response.status_code == 200:
+            self.cache.store(url, auth, response)
+        return response
+
+    def _get(self, url, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            profiler.count("requests")
+            response = self.session.get(url, **kwargs)
+            delay = self._rate_limit_delay(response, attempt)
+            if delay is None or attempt == self.max_retries:
+                return response
+            response.close()
+            time.sleep(delay)
+        return response
+
+    def close(self):
+        self.session.close()
+
+# --- Artifact Store ---
+
+
+def parse_digest(digest):
+    """Returns the hex SHA-256 from a GitHub `digest` field ("sha256:..."), or None."""
+    if digest and digest.startswith("sha256:"):
+        return digest.split(":", 1)[1].lower()
+    return None
+
+
+class ArtifactStore:
+    """Content-addressed store for downloaded build artifacts and release tarballs.
+
+    Files are kept as `blobs/<sha256>`, `index.json` maps a key (artifact ID or
+    asset name) to its digest, size and access times. Entries that haven't been
+    used for `max_age_days` are dropped, after that the least recently used ones
+    until the store fits into `max_bytes`.
+    """
+
+    def __init__(self, store_dir=None, max_bytes=ARTIFACT_STORE_MAX_MB * 1024 * 1024,
+                 max_age_days=ARTIFACT_STORE_MAX_AGE_DAYS):
+        store_dir = store_dir or ARTIFACT_STORE_DIR
+        self.store_dir = store_dir
+        self.blob_dir = store_dir / "blobs"
+        self.index_file = store_dir / "index.json"
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self._lock = threading.Lock()
+
+    def _load_index(self):
+        try:
+            return json.loads(self.index_file.read_text())
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self, index):
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(index, indent=4))
+        os.replace(tmp_path, self.index_file)
+
+    def blob_path(self, sha256):
+        return self.blob_dir / sha256
+
+    def lookup(self, key, sha256=None):
+        """Returns the path of a stored file by digest or key, or None on a miss."""
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(key)
+            if sha256 is None and entry:
+                sha256 = entry["sha256"]
+            if not sha256 or not self.blob_path(sha256).is_file():
+                return None
+            if entry is None or entry["sha256"] != sha256:
+                entry = {"sha256": sha256, "size": self.blob_path(sha256).stat().st_size,
+                         "created": time.time()}
+                index[key] = entry
+            entry["last_used"] = time.time()
+            self._save_index(index)
+            return self.blob_path(sha256)
+
+    def add(self, key, file_path, sha256):
+        """Moves a downloaded file into the store and returns its new path."""
+        with self._lock:
+            self.blob_dir.mkdir(parents=True, exist_ok=True)
+            blob = self.blob_path(sha256)
+            if blob.exists():
+                Path(file_path).unlink()
+            else:
+                shutil.move(str(file_path), str(blob))
+            index = self._load_index()
+            now = time.time()
+            index[key] = {"sha256": sha256, "size": blob.stat().st_size,
+                          "created": index.get(key, {}).get("created", now), "last_used": now}
+            self._prune(index, keep={sha256})
+            self._save_index(index)
+            return blob
+
+    def _prune(self, index, keep=()):
+        """Drops expired and least recently used entries and deletes orphaned blobs."""
+        max_age = self.max_age_days * 86400
+        now = time.time()
+        for key in [k for k, e in index.items()
+                    if now - e.get("last_used", 0) > max_age and e["sha256"] not in keep]:
+            del index[key]
+
+        # Several keys can point to the same blob, only count it once
+        blobs = {}
+        for entry in index.values():
+            last_used = max(entry.get("last_used", 0),
+                            blobs.get(entry["sha256"], (0, 0))[0])
+            blobs[entry["sha256"]] = (last_used, entry["size"])
+        total = sum(size for _, size in blobs.values())
+        for sha256, (_, size) in sorted(blobs.items(), key=lambda item: item[1][0]):
+            if total <= self.max_bytes:
+                break
+            if sha256 in keep:
+                continue
+            for key in [k for k, e in index.items() if e["sha256"] == sha256]:
+                del index[key]
+            total -= size
+
+        referenced = {entry["sha256"] for entry in index.values()}
+        if self.blob_dir.is_dir():
+            for blob in self.blob_dir.iterdir():
+                if blob.name not in referenced:
+                    try:
+                        blob.unlink()
+                    except OSError:
+                        pass
+
+
+# --- Backup Store ---
+
+
+class BackupStore:
+    """Deduplicated backups below `yabridge-backups`.
+
+    Every backup directory stays a complete file tree, but each regular file in
+    it is a hardlink to `.store/blobs/<sha256>`, so identical files of different
+    builds only take up space once. A manifest in each backup records the digest,
+    size and mode of its files. A blob whose link count has dropped to one is no
+    longer used by any backup and gets removed by `collect_garbage`.
+
+    With `backup_format` set to "xz" or "zstd", new backups are written as a
+    single compressed tar instead. Its first member is an index with the
+    `.version` data and the list of members, so it can be read without
+    decompressing the rest of the archive.
+
+    `index.json` holds the name, date, version, size and file count of every
+    backup. It's updated whenever a backup is created or removed through this
+    class, backups that appeared or disappeared otherwise are noticed by
+    comparing it to the directory listing and only those are inspected.
+    """
+
+    def __init__(self, backup_base_dir, backup_format="dir", compression_level=None):
+        self.backup_base_dir = backup_base_dir
+        self.blob_dir = backup_base_dir / BACKUP_STORE_DIRNAME / "blobs"
+        self.catalog_file = backup_base_dir / BACKUP_CATALOG_FILE
+        self.trash_dir = backup_base_dir / BACKUP_TRASH_DIRNAME
+        self.backup_format = backup_format
+        self.compression_level = compression_level
+
+    def blob_path(self, sha256):
+        return self.blob_dir / sha256
+
+    def new_backup_dir(self, prefix="yabridge-backup"):
+        """Returns an unused backup directory path named after the current time."""
+        name = f"{prefix}-{datetime.datetime.now().strftime('%F-%H%M%S')}"
+        backup_dir = self.backup_base_dir / name
+        suffix = 1
+        while backup_dir.exists() or any(backup_dir.with_name(backup_dir.name + archive_suffix).exists()
+                                         for archive_suffix in BACKUP_ARCHIVE_SUFFIXES.values()):
+            suffix += 1
+            backup_dir = self.backup_base_dir / f"{name}-{suffix}"
+        return backup_dir
+
+    def create(self, yabridge_dir, prefix="yabridge-backup", copy=False):
+        """Moves an installation into a new backup and deduplicates its files.
+
+        With `copy`, the installation stays where it is and the backup is made
+        of hardlinks to its files. Returns the path of the backup directory or
+        archive.
+        """
+        self.backup_base_dir.mkdir(parents=True, exist_ok=True)
+        if self.backup_format in BACKUP_ARCHIVE_SUFFIXES:
+            backup = self.create_archive(yabridge_dir, prefix, copy)
+        else:
+            backup = self.new_backup_dir(prefix)
+            print_info(get_string("install_backing_up",
+                       backup_dir=f"{C.OKCYAN}{backup}{C.ENDC}"))
+            if copy:
+                shutil.copytree(yabridge_dir, backup, symlinks=True, copy_function=link_or_copy)
+            else:
+                shutil.move(str(yabridge_dir), str(backup))
+            try:
+                files, linked, saved = self.deduplicate(backup)
+            except OSError as e:
+                # The backup itself is complete, it just takes up more space
+                print_warning(f"{e}")
+            else:
+                print_info(get_string("backup_deduplicated", files=files,
+                           linked=linked, size=format_size(saved)))
+        self.update_catalog(added=[backup])
+        return backup
+
+    def deduplicate(self, backup_dir):
+        """Replaces the files of a backup with hardlinks into the store and writes its manifest.
+
+        Returns the number of files, how many of them were already in the store
+        and the number of bytes that saved.
+        """
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        # Files restored from an earlier backup are still linked to their blob,
+        # recognize those by inode instead of hashing them again
+        known_inodes = {}
+        for blob in self.blob_dir.iterdir():
+            blob_stat = blob.stat()
+            known_inodes[(blob_stat.st_dev, blob_stat.st_ino)] = blob.name
+
+        manifest = {"created": time.time(), "files": {}, "symlinks": {}}
+        linked, saved = 0, 0
+        for path in sorted(backup_dir.rglob("*")):
+            relative = path.relative_to(backup_dir).as_posix()
+            if relative == BACKUP_MANIFEST_FILE:
+                continue
+            if path.is_symlink():
+                manifest["symlinks"][relative] = os.readlink(path)
+                continue
+            if not path.is_file():
+                continue
+            file_stat = path.stat()
+            sha256 = known_inodes.get((file_stat.st_dev, file_stat.st_ino))
+            if sha256 is None:
+                sha256 = hash_file(path)
+            blob = self.blob_path(sha256)
+            if not blob.exists():
+                os.link(path, blob)
+                known_inodes[(file_stat.st_dev, file_stat.st_ino)] = sha256
+            elif not os.path.samefile(path, blob):
+                tmp_link = path.with_name(f".{path.name}.link")
+                os.link(blob, tmp_link)
+                os.replace(tmp_link, path)
+                linked += 1
+                saved += file_stat.st_size
+            else:
+                linked += 1
+            manifest["files"][relative] = {"sha256": sha256, "size": file_stat.st_size,
+                                           "mode": stat.S_IMODE(file_stat.st_mode)}
+
+        (backup_dir / BACKUP_MANIFEST_FILE).write_text(json.dumps(manifest, indent=4))
+        return len(manifest["files"]), linked, saved
+
+    def create_archive(self, yabridge_dir, prefix="yabridge-backup", copy=False):
+        """Moves an installation out of the way and packs it into a compressed tar.
+
+        Falls back to a regular directory backup if the archive can't be written.
+        With `copy`, the installation is packed where it is.
+        """
+        archive_format = self.backup_format
+        if archive_format == "zstd" and not check_command_exists("zstd"):
+            print_warning(get_string("backup_zstd_missing"))
+            archive_format = "xz"
+        backup_dir = self.new_backup_dir(prefix)
+        archive_path = backup_dir.with_name(
+            backup_dir.name + BACKUP_ARCHIVE_SUFFIXES[archive_format])
+        print_info(get_string("install_backing_up",
+                   backup_dir=f"{C.OKCYAN}{archive_path}{C.ENDC}"))
+
+        if copy:
+            staging_dir = yabridge_dir
+        else:
+            staging_dir = self.backup_base_dir / f".{backup_dir.name}.staging"
+            shutil.move(str(yabridge_dir), str(staging_dir))
+        try:
+            files = self.write_archive(staging_dir, archive_path, archive_format)
+        except (OSError, lzma.LZMAError, tarfile.TarError, subprocess.SubprocessError) as e:
+            print_warning(get_string("backup_archive_failed", error=e))
+            if copy:
+                shutil.copytree(yabridge_dir, backup_dir, symlinks=True, copy_function=link_or_copy)
+            else:
+                os.replace(staging_dir, backup_dir)
+            try:
+                self.deduplicate(backup_dir)
+            except OSError as e:
+                print_warning(f"{e}")
+            return backup_dir
+        if not copy:
+            shutil.rmtree(staging_dir)
+        print_info(get_string("backup_archived", files=files,
+                   size=format_size(archive_path.stat().st_size)))
+        return archive_path
+
+    def write_archive(self, source_dir, archive_path, archive_format):
+        """Writes `source_dir` with a leading index to a compressed tar. Returns the file count."""
+        paths = sorted(source_dir.rglob("*"))
+        members = []
+        for path in paths:
+            path_stat = path.lstat()
+            member_type = "symlink" if stat.S_ISLNK(path_stat.st_mode) else \
+                "dir" if stat.S_ISDIR(path_stat.st_mode) else "file"
+            members.append({"name": path.relative_to(source_dir).as_posix(), "type": member_type,
+                            "size": path_stat.st_size if member_type == "file" else 0,
+                            "mode": stat.S_IMODE(path_stat.st_mode)})
+        try:
+            version = json.loads((source_dir / ".version").read_text())
+        except (OSError, json.JSONDecodeError):
+            version = None
+        index_data = json.dumps({"created": time.time(), "format": archive_format,
+                                 "version": version, "members": members}, indent=4).encode()
+
+        tmp_path = archive_path.with_name(f".{archive_path.name}.tmp")
+        try:
+            with open_compressed(tmp_path, archive_format, "wb", self.compression_level) as f:
+                with tarfile.open(fileobj=f, mode="w|") as tar:
+                    index_info = tarfile.TarInfo(BACKUP_INDEX_FILE)
+                    index_info.size = len(index_data)
+                    index_info.mtime = int(time.time())
+                    tar.addfile(index_info, io.BytesIO(index_data))
+                    for path in paths:
+                        tar.add(path, arcname=path.relative_to(source_dir).as_posix(), recursive=False)
+            os.replace(tmp_path, archive_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return sum(1 for member in members if member["type"] == "file")
+
+    def read_archive_index(self, archive_path):
+        """Returns the index of a backup archive, only the first member is decompressed."""
+        with open_compressed(archive_path, archive_format_of(archive_path), "rb") as f:
+            with tarfile.open(fileobj=f, mode="r|") as tar:
+                member = tar.next()
+                if member is None or member.name != BACKUP_INDEX_FILE:
+                    return None
+                return json.load(tar.extractfile(member))
+
+    def read_version(self, backup):
+        """Returns the `.version` data of a backup directory or archive, or None."""
+        if archive_format_of(backup):
+            index = self.read_archive_index(backup)
+            return index.get("version") if index else None
+        version_file = backup / ".version"
+        if not version_file.is_file():
+            return None
+        return json.loads(version_file.read_text())
+
+    def move_to_trash(self, backups):
+        """Renames backups into the trash directory, which is instant and atomic.
+
+        Returns a list of `(backup, error)` tuples for backups that couldn't be moved.
+        """
+        self.trash_dir.mkdir(parents=True, exist_ok=True)
+        moved, failed = [], []
+        for backup in backups:
+            target = self.trash_dir / backup.name
+            if target.exists():
+                target = self.trash_dir / f"{backup.name}.{os.getpid()}.{time.monotonic_ns()}"
+            try:
+                os.rename(backup, target)
+                moved.append(backup)
+            except OSError as e:
+                failed.append((backup, e))
+        self.update_catalog(removed=moved)
+        return failed
+
+    def empty_trash(self, sizes=None, max_workers=BACKUP_DELETE_WORKERS):
+        """Deletes everything in the trash with several workers in parallel.
+
+        The trash may still contain backups from an earlier prune that was
+        interrupted, those are deleted as well. `sizes` maps backup names to
+        their size for the progress display. Returns a list of `(path, error)`
+        tuples for entries that couldn't be deleted.
+        """
+        if not self.trash_dir.is_dir():
+            return []
+        entries = list(self.trash_dir.iterdir())
+        if not entries:
+            return []
+        sizes = sizes or {}
+        label = get_string("backup_trash_label")
+        progress = ProgressDisplay([label])
+        progress.set_total(label, sum(sizes.get(entry.name, 0) for entry in entries))
+        print_info(get_string("backup_emptying_trash", count=len(entries)))
+
+        def remove(path):
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path)
+            else:
+                path.unlink()
+            return path
+
+        failed, done = [], 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(remove, entry): entry for entry in entries}
+            for future in concurrent.futures.as_completed(futures):
+                entry = futures[future]
+                try:
+                    future.result()
+                except OSError as e:
+                    failed.append((entry, e))
+                done += sizes.get(entry.name, 0)
+                progress.update(label, done)
+        progress.finish(label)
+        return failed
+
+    def restore(self, backup_dir, yabridge_dir):
+        """Recreates an installation from a backup and removes the backup afterwards.
+
+        Backups from before the store existed don't have a manifest and are moved
+        into place as a whole, archives are extracted as a stream.
+        """
+        self._restore_files(backup_dir, yabridge_dir)
+        self.update_catalog(removed=[backup_dir])
+
+    def _restore_files(self, backup_dir, yabridge_dir):
+        archive_format = archive_format_of(backup_dir)
+        if archive_format:
+            staging_dir = yabridge_dir.with_name(f".{yabridge_dir.name}.restoring")
+            if staging_dir.exists():
+                shutil.rmtree(staging_dir)
+            staging_dir.mkdir(parents=True)
+            try:
+                with open_compressed(backup_dir, archive_format, "rb") as f:
+                    with tarfile.open(fileobj=f, mode="r|") as tar:
+                        extract_tar_stream(tar, staging_dir)
+                (staging_dir / BACKUP_INDEX_FILE).unlink(missing_ok=True)
+                os.replace(staging_dir, yabridge_dir)
+            except BaseException:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+                raise
+            backup_dir.unlink()
+            return
+
+        manifest_file = backup_dir / BACKUP_MANIFEST_FILE
+        if not manifest_file.is_file():
+            shutil.move(str(backup_dir), str(yabridge_dir))
+            return
+
+        manifest = json.loads(manifest_file.read_text())
+        staging_dir = yabridge_dir.with_name(f".{yabridge_dir.name}.restoring")
+        if staging_dir.exists():
+            shutil.rmtree(staging_dir)
+        staging_dir.mkdir(parents=True)
+        try:
+            for relative, entry in manifest["files"].items():
+                target = staging_dir / relative
+                target.parent.mkdir(parents=True, exist_ok=True)
+                # Prefer the blob, fall back to the file in the backup tree
+                for source in (self.blob_path(entry["sha256"]), backup_dir / relative):
+                    if source.is_file():
+                        break
+                else:
+                    raise FileNotFoundError(get_string("backup_blob_missing", name=relative))
+                # The blob is shared with other backups and installations, it must
+                # never be chmodded. A file with a different mode gets its own copy.
+                if stat.S_IMODE(source.stat().st_mode) == entry["mode"]:
+                    link_or_copy(source, target)
+                else:
+                    shutil.copyfile(source, target)
+                    os.chmod(target, entry["mode"])
+            for relative, link_target in manifest["symlinks"].items():
+                target = staging_dir / relative
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.symlink(link_target, target)
+            os.replace(staging_dir, yabridge_dir)
+        except BaseException:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+        shutil.rmtree(backup_dir)
+
+    def _load_catalog(self):
+        try:
+            catalog = json.loads(self.catalog_file.read_text())
+        except (OSError, json.JSONDecodeError):
+            return {}
+        if catalog.get("version") != BACKUP_CATALOG_VERSION:
+            return {}
+        return catalog.get("backups", {})
+
+    def _save_catalog(self, entries):
+        self.backup_base_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.catalog_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(
+            {"version": BACKUP_CATALOG_VERSION, "backups": entries}, indent=4))
+        os.replace(tmp_path, self.catalog_file)
+
+    def catalog_entry(self, backup):
+        """Collects the metadata of a single backup for the catalog."""
+        archive_format = archive_format_of(backup)
+        entry = {"name": backup.name, "format": archive_format or "dir", "created": None,
+                 "sha": None, "branch": None, "size": 0, "files": 0, "invalid_version": False}
+        try:
+            if archive_format:
+                entry["size"] = backup.stat().st_size
+                index = self.read_archive_index(backup) or {}
+                entry["created"] = index.get("created")
+                entry["files"] = sum(1 for member in index.get("members", [])
+                                     if member["type"] == "file")
+                version = index.get("version")
+            else:
+                for path in backup.rglob("*"):
+                    if path.is_file() and not path.is_symlink() and path.name != BACKUP_MANIFEST_FILE:
+                        entry["size"] += path.stat().st_size
+                        entry["files"] += 1
+                manifest_file = backup / BACKUP_MANIFEST_FILE
+                if manifest_file.is_file():
+                    manifest = json.loads(manifest_file.read_text())
+                    entry["created"] = manifest.get("created")
+                    # Backups share these blobs, size budgets count each of them once
+                    entry["blobs"] = {file["sha256"]: file["size"] for file in manifest["files"].values()}
+                version = self.read_version(backup)
+            if version:
+                entry["sha"], entry["branch"] = version.get("sha"), version.get("branch")
+        except (json.JSONDecodeError, OSError, lzma.LZMAError, tarfile.TarError):
+            entry["invalid_version"] = True
+        if entry["created"] is None:
+            with contextlib.suppress(OSError):
+                entry["created"] = backup.stat().st_mtime
+        return entry
+
+    def update_catalog(self, added=(), removed=()):
+        """Adds and removes backups in the catalog without rescanning the others."""
+        entries = self._load_catalog()
+        for backup in removed:
+            entries.pop(backup.name, None)
+        for backup in added:
+            entries[backup.name] = self.catalog_entry(backup)
+        self._save_catalog(entries)
+
+    def catalog(self, prefix="yabridge-backup-"):
+        """Returns the catalog entries of all backups, newest first.
+
+        Only backups that aren't in the catalog yet are inspected, entries of
+        backups that no longer exist are dropped.
+        """
+        entries = self._load_catalog()
+        names = {path.name for path in list_backups(self.backup_base_dir, prefix)}
+        stale = [name for name in entries if name.startswith(prefix) and name not in names]
+        missing = [name for name in names if name not in entries]
+        if stale or missing or not self.catalog_file.exists():
+            for name in stale:
+                del entries[name]
+            for name in missing:
+                entries[name] = self.catalog_entry(self.backup_base_dir / name)
+            if self.backup_base_dir.is_dir():
+                self._save_catalog(entries)
+        return sorted((entry for name, entry in entries.items() if name in names),
+                      key=lambda entry: backup_display_name(Path(entry["name"])), reverse=True)
+
+    def freed_size(self, backups):
+        """Estimates how many bytes deleting the given backups frees.
+
+        Archives and backups without manifest free their full size, for
+        deduplicated backups only blobs that no other backup or installation
+        links to are counted.
+        """
+        freed = 0
+        references = {}
+        for backup in backups:
+            manifest_file = backup / BACKUP_MANIFEST_FILE
+            if archive_format_of(backup) or not manifest_file.is_file():
+                freed += self.catalog_entry(backup)["size"] if not archive_format_of(backup) \
+                    else backup.stat().st_size
+                continue
+            try:
+                manifest = json.loads(manifest_file.read_text())
+            except (OSError, json.JSONDecodeError):
+                continue
+            for entry in manifest["files"].values():
+                references[entry["sha256"]] = references.get(entry["sha256"], 0) + 1
+        for sha256, count in references.items():
+            try:
+                blob_stat = self.blob_path(sha256).stat()
+            except OSError:
+                continue
+            # One link is the blob itself
+            if blob_stat.st_nlink - 1 <= count:
+                freed += blob_stat.st_size
+        return freed
+
+    def collect_garbage(self):
+        """Deletes blobs that no backup links to anymore. Returns their count and size."""
+        removed, freed = 0, 0
+        if not self.blob_dir.is_dir():
+            return removed, freed
+        for blob in self.blob_dir.iterdir():
+            try:
+                blob_stat = blob.stat()
+                if blob_stat.st_nlink <= 1:
+                    blob.unlink()
+                    removed += 1
+                    freed += blob_stat.st_size
+            except OSError:
+                pass
+        return removed, freed
+
+
+def archive_format_of(backup):
+    """Returns "xz" or "zstd" for a backup archive, None for a backup directory."""
+    for archive_format, suffix in BACKUP_ARCHIVE_SUFFIXES.items():
+        if backup.name.endswith(suffix):
+            return archive_format
+    return None
+
+
+def list_backups(backup_base_dir, prefix="yabridge-backup-"):
+    """Returns all backup directories and archives, newest first.
+
+    Uses the file types from the directory listing, so no backup is stat'ed.
+    """
+    if not backup_base_dir.is_dir():
+        return []
+    with os.scandir(backup_base_dir) as it:
+        backups = [Path(entry.path) for entry in it if entry.name.startswith(prefix)
+                   and (entry.is_dir(follow_symlinks=False) or archive_format_of(entry))]
+    return sorted(backups, key=backup_display_name, reverse=True)
+
+
+def backup_display_name(backup):
+    """Returns the name of a backup without its archive suffix."""
+    archive_format = archive_format_of(backup)
+    return backup.name[:-len(BACKUP_ARCHIVE_SUFFIXES[archive_format])] if archive_format else backup.name
+
+
+@contextlib.contextmanager
+def open_compressed(path, archive_format, mode, level=None):
+    """Opens an xz or zstd compressed file as a binary stream for reading ("rb") or writing ("wb").
+
+    xz goes through the lzma module, zstd through the `zstd` command line tool.
+    """
+    if archive_format == "xz":
+        with lzma.open(path, mode, **({} if level is None or mode == "rb" else {"preset": level})) as f:
+            yield f
+        return
+
+    if mode == "wb":
+        cmd = ["zstd", "-q", "-f", "-T0", "-o", str(path)]
+        if level is not None:
+            cmd += ["--ultra"] if level > 19 else []
+            cmd.append(f"-{level}")
+        process = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+        try:
+            yield process.stdin
+        finally:
+            process.stdin.close()
+            process.wait()
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, cmd)
+        return
+
+    cmd = ["zstd", "-q", "-d", "-c", str(path)]
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+    try:
+        yield process.stdout
+    finally:
+        process.stdout.close()
+        # Readers like `read_archive_index` stop early, zstd doesn't need to finish then
+        if process.poll() is None:
+            process.terminate()
+        process.wait()
+
+
+def hash_file(path, chunk_size=DOWNLOAD_MAX_CHUNK_SIZE):
+    """Returns the hex SHA-256 of a file."""
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
 # --- Token Management ---
 
 
@@ -349,6 +1712,7 @@ def save_token_to_file(token):
         print_error(get_string("token_encryption_failed"))
 
 
+@profiler.span("get_token")
 def get_token():
     token = os.environ.get("GITHUB_TOKEN")
     if token:
@@ -356,6 +1720,9 @@ def get_token():
     token = get_github_token_from_keyring()
     if token:
         return token, "keyring"
+    if _assume_yes:
+        # Decrypting the token file and asking for a token both need a person
+        return None, None
     token = get_github_token_from_file()
     if token:
         return token, "file"
@@ -365,7 +1732,7 @@ def get_token():
     if not token:
         return None, None
 
-    if input(f"{C.WARNING}{get_string('token_save_prompt')}{C.ENDC} ").lower().strip() in ["j", "ja", "y", "yes"]:
+    if confirm(get_string('token_save_prompt')):
         if check_command_exists("secret-tool"):
             save_token_to_keyring(token)
         elif check_command_exists("openssl"):
@@ -390,6 +1757,120 @@ def clear_tokens():
         print_success(get_string("token_clear_file_success"))
     print_info(get_string("token_clear_finished"))
 
+# --- Staged Installations ---
+
+
+def staged_versions_dir(yabridge_dir):
+    return yabridge_dir.parent / STAGED_VERSIONS_DIRNAME
+
+
+def is_staged_install(yabridge_dir):
+    """Whether `yabridge_dir` is a symlink to the `current` link of the versions directory."""
+    current_link = staged_versions_dir(yabridge_dir) / STAGED_CURRENT_LINK
+    return yabridge_dir.is_symlink() and current_link.is_symlink()
+
+
+def active_version_dir(yabridge_dir):
+    """Returns the version directory a staged installation points to, or None."""
+    if not is_staged_install(yabridge_dir):
+        return None
+    versions_dir = staged_versions_dir(yabridge_dir)
+    return versions_dir / os.readlink(versions_dir / STAGED_CURRENT_LINK)
+
+
+def list_staged_versions(yabridge_dir):
+    """Returns all version directories, the most recently activated first."""
+    versions_dir = staged_versions_dir(yabridge_dir)
+    if not versions_dir.is_dir():
+        return []
+    versions = [path for path in versions_dir.iterdir() if path.is_dir() and not path.is_symlink()
+                and not path.name.startswith(".")]
+    return sorted(versions, key=lambda path: path.stat().st_mtime, reverse=True)
+
+
+def replace_symlink(link_path, target):
+    """Points `link_path` to `target` atomically by renaming a new symlink over it."""
+    tmp_link = link_path.with_name(f".{link_path.name}.{os.getpid()}.tmp")
+    tmp_link.unlink(missing_ok=True)
+    os.symlink(target, tmp_link)
+    os.replace(tmp_link, link_path)
+
+
+def prepare_install_dir(yabridge_dir, staged=False, backups=None, delta=False):
+    """Returns the directory the new build should be extracted into and the previous manifest.
+
+    Regular installations move the current one into the backups and reuse
+    `yabridge_dir`. Staged installations extract into a hidden staging
+    directory next to the versions and leave the active one alone. For a
+    delta update, the current files stay in place (or are hardlinked into
+    the staging directory) and the manifest of the current installation is
+    returned so only changed files get written.
+    """
+    backups = backups or BackupStore(yabridge_dir.parent / "yabridge-backups")
+    if staged:
+        staging_dir = staged_versions_dir(yabridge_dir) / ".staging"
+        if staging_dir.exists():
+            shutil.rmtree(staging_dir)
+        active = active_version_dir(yabridge_dir) if delta else None
+        if active and active.is_dir():
+            shutil.copytree(active, staging_dir, symlinks=True, copy_function=link_or_copy)
+        else:
+            staging_dir.mkdir(parents=True)
+        print_info(get_string("install_staging",
+                   path=f"{C.OKCYAN}{staging_dir}{C.ENDC}"))
+        return staging_dir, load_install_manifest(staging_dir) if active else None
+    if delta and yabridge_dir.is_dir():
+        # The backup shares all files with the installation, changed ones get replaced by a rename
+        backups.create(yabridge_dir, copy=True)
+        return yabridge_dir, load_install_manifest(yabridge_dir)
+    if yabridge_dir.exists():
+        backups.create(yabridge_dir)
+    yabridge_dir.mkdir(parents=True, exist_ok=True)
+    return yabridge_dir, None
+
+
+def complete_staged_install(yabridge_dir, staging_dir, version_name, backups=None):
+    """Turns the staging directory into a version directory and switches to it."""
+    versions_dir = staging_dir.parent
+    version_dir = versions_dir / version_name
+    suffix = 1
+    while version_dir.exists():
+        suffix += 1
+        version_dir = versions_dir / f"{version_name}-{suffix}"
+    os.rename(staging_dir, version_dir)
+
+    backups = backups or BackupStore(yabridge_dir.parent / "yabridge-backups")
+    if yabridge_dir.exists() and not yabridge_dir.is_symlink():
+        # Switching from a regular installation, keep it as a backup
+        backups.create(yabridge_dir)
+    activate_version(yabridge_dir, version_dir)
+    retire_old_versions(yabridge_dir, backups)
+
+
+def activate_version(yabridge_dir, version_dir):
+    """Makes a version directory the active installation, an O(1) symlink swap."""
+    versions_dir = staged_versions_dir(yabridge_dir)
+    replace_symlink(versions_dir / STAGED_CURRENT_LINK, version_dir.name)
+    if not yabridge_dir.is_symlink():
+        replace_symlink(yabridge_dir, os.path.relpath(
+            versions_dir / STAGED_CURRENT_LINK, yabridge_dir.parent))
+    # The modification time orders the versions by when they were last active
+    os.utime(version_dir)
+    print_success(get_string("install_activated",
+                  name=f"{C.OKCYAN}{version_dir.name}{C.ENDC}"))
+
+
+def retire_old_versions(yabridge_dir, backups, keep=STAGED_KEEP_VERSIONS):
+    """Moves all but the `keep` most recently active versions into the backups."""
+    active = active_version_dir(yabridge_dir)
+    for version_dir in list_staged_versions(yabridge_dir)[keep:]:
+        if active and version_dir.name == active.name:
+            continue
+        print_info(get_string("install_retiring_version",
+                   name=f"{C.OKCYAN}{version_dir.name}{C.ENDC}"))
+        backups.create(version_dir)
+
+
 # --- Core Logic Functions ---
 
 
@@ -410,11 +1891,55 @@ def select_install_type():
         return "development"
 
 
-def select_branch(headers, token_source):
+def probe_branch(name, client):
+    """Returns the latest successful workflow run of a branch, or None."""
+    url = client.repo_url(
+        f"actions/runs?branch={name}&status=success&per_page=1")
+    run_response = client.get(url)
+    check_rate_limit(run_response)
+    if run_response.status_code != 200:
+        return None
+    runs = run_response.json().get("workflow_runs")
+    return runs[0] if runs else None
+
+
+def discover_successful_runs(client, wanted_branches=None, max_pages=DISCOVERY_MAX_PAGES):
+    """Pages through the successful workflow runs once and returns the newest run per branch.
+
+    Paging stops early once every branch in `wanted_branches` has been seen.
+    Also returns whether the whole listing was read, in which case branches
+    that weren't found have no successful run at all.
+    """
+    runs_by_branch = {}
+    for page in range(1, max_pages + 1):
+        url = client.repo_url(
+            f"actions/runs?status=success&per_page={DISCOVERY_PAGE_SIZE}&page={page}")
+        response = client.get(url)
+        check_rate_limit(response)
+        response.raise_for_status()
+        runs = response.json().get("workflow_runs", [])
+        # GitHub lists runs newest first, so the first run seen per branch wins
+        for run in runs:
+            runs_by_branch.setdefault(run.get("head_branch"), run)
+        if len(runs) < DISCOVERY_PAGE_SIZE:
+            return runs_by_branch, True
+        if wanted_branches is not None and wanted_branches.issubset(runs_by_branch):
+            break
+    return runs_by_branch, False
+
+
+@profiler.span("select_branch")
+def select_branch(client, token_source, max_workers=DEFAULT_PROBE_WORKERS, discovery="runs", runs_by_branch=None):
+    """Lets the user pick a branch with successful builds.
+
+    The latest run found for each branch is stored in `runs_by_branch` (if given),
+    so that get_latest_run_info() doesn't have to query it again.
+    """
+    if runs_by_branch is None:
+        runs_by_branch = {}
     print_header(get_string("branch_select_header"))
     print_info(get_string("branch_loading"))
-    response = requests.get(
-        f"https://api.github.com/repos/{REPO}/branches", headers=headers)
+    response = client.get(client.repo_url("branches"))
     check_rate_limit(response)
     response.raise_for_status()
     branches_json = response.json()
@@ -424,14 +1949,36 @@ def select_branch(headers, token_source):
                          response_text=response.text))
 
     print_info(get_string("branch_checking_artifacts"))
-    branches_with_artifacts = []
-    for name in [branch["name"] for branch in branches_json]:
-        print(get_string("branch_checking_branch", name=name))
-        url = f"https://api.github.com/repos/{REPO}/actions/runs?branch={name}&status=success&per_page=1"
-        run_response = requests.get(url, headers=headers)
-        check_rate_limit(run_response)
-        if run_response.status_code == 200 and run_response.json().get("workflow_runs"):
-            branches_with_artifacts.append(name)
+    branch_names = [branch["name"] for branch in branches_json]
+    to_probe = branch_names
+    if discovery == "runs":
+        discovered, complete = discover_successful_runs(client, set(branch_names))
+        runs_by_branch.update(
+            {name: run for name, run in discovered.items() if name in branch_names})
+        for name in branch_names:
+            if name in runs_by_branch:
+                print(f"{C.OKGREEN}{get_string('branch_has_artifacts', name=name)}{C.ENDC}")
+            elif complete:
+                print(get_string("branch_no_artifacts", name=name))
+        # Only if paging stopped at DISCOVERY_MAX_PAGES can older successes be missing
+        to_probe = [] if complete else [name for name in branch_names if name not in runs_by_branch]
+
+    if to_probe:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {executor.submit(probe_branch, name, client): name
+                       for name in to_probe}
+            # Report each branch as soon as its probe returns
+            for future in concurrent.futures.as_completed(futures):
+                name = futures[future]
+                run = future.result()
+                if run:
+                    runs_by_branch[name] = run
+                    print(f"{C.OKGREEN}{get_string('branch_has_artifacts', name=name)}{C.ENDC}")
+                else:
+                    print(get_string("branch_no_artifacts", name=name))
+    # Keep the order in which GitHub returned the branches
+    branches_with_artifacts = [
+        name for name in branch_names if name in runs_by_branch]
 
     if not branches_with_artifacts:
         raise ValueError(get_string("branch_no_artifacts_found"))
@@ -454,29 +2001,34 @@ def select_branch(headers, token_source):
     return branch
 
 
-def get_latest_run_info(branch, headers):
+@profiler.span("get_latest_run_info")
+def get_latest_run_info(branch, client, runs_by_branch=None):
     print_info(get_string("run_latest_info",
                branch=f"{C.OKCYAN}{branch}{C.ENDC}"))
-    url = f"https://api.github.com/repos/{REPO}/actions/runs?branch={branch}&status=success&per_page=1"
-    response = requests.get(url, headers=headers)
-    check_rate_limit(response)
-    response.raise_for_status()
-    runs_json = response.json()
+    if runs_by_branch and branch in runs_by_branch:
+        latest_run = runs_by_branch[branch]
+    else:
+        url = client.repo_url(
+            f"actions/runs?branch={branch}&status=success&per_page=1")
+        response = client.get(url)
+        check_rate_limit(response)
+        response.raise_for_status()
+        runs_json = response.json()
 
-    if not runs_json.get("workflow_runs"):
-        raise ValueError(get_string("run_no_successful"))
-    latest_run = runs_json["workflow_runs"][0]
+        if not runs_json.get("workflow_runs"):
+            raise ValueError(get_string("run_no_successful"))
+        latest_run = runs_json["workflow_runs"][0]
     remote_version, artifacts_url = latest_run["head_sha"], latest_run["artifacts_url"]
     if not remote_version or not artifacts_url:
         raise ValueError(get_string("run_no_version_id"))
     return remote_version, artifacts_url
 
 
-def get_latest_stable_info(headers):
+@profiler.span("get_latest_stable_info")
+def get_latest_stable_info(client):
     print_header(get_string("stable_release_header"))
     print_info(get_string("stable_checking"))
-    url = f"https://api.github.com/repos/{REPO}/releases/latest"
-    response = requests.get(url, headers=headers)
+    response = client.get(client.repo_url("releases/latest"))
     check_rate_limit(response)
     response.raise_for_status()
     release_json = response.json()
@@ -487,131 +2039,648 @@ def get_latest_stable_info(headers):
     return release_json["tag_name"], release_json["assets"]
 
 
-def download_and_extract(name, url, headers, tmp_path, yabridge_dir):
-    print_info(get_string("install_downloading",
+def partial_download_path(url):
+    """Returns the staging path for a resumable download and cleans up stale leftovers."""
+    DOWNLOAD_STAGING_DIR.mkdir(parents=True, exist_ok=True)
+    max_age = DOWNLOAD_STAGING_MAX_AGE_DAYS * 86400
+    for leftover in DOWNLOAD_STAGING_DIR.iterdir():
+        try:
+            if time.time() - leftover.stat().st_mtime > max_age:
+                leftover.unlink()
+        except OSError:
+            pass
+    return DOWNLOAD_STAGING_DIR / f"{hashlib.sha256(url.encode()).hexdigest()[:32]}.part"
+
+
+class DownloadReader:
+    """File-like view of a streamed, resumable HTTP download.
+
+    Everything that is read gets hashed, saved to `partial_path` (if given) and
+    reported to the progress display, so a download can be consumed directly
+    by `tarfile` in stream mode while it is saved and checked at the same time.
+
+    The expected size and the ETag/Last-Modified validators are stored next to
+    the partial file. If a partial file from an earlier run is found, its
+    content is handed out first and the rest is requested with `Range` and
+    `If-Range`. Connections that break mid-stream are resumed the same way with
+    exponential backoff. Servers that ignore `Range` send the whole file again,
+    in which case the part we already have is skipped. A partial file the
+    server can't continue (416, e.g. it is longer than the file) is discarded.
+
+    The chunk size starts at DOWNLOAD_MIN_CHUNK_SIZE and is doubled while
+    chunks arrive quickly (up to DOWNLOAD_MAX_CHUNK_SIZE), so fast links don't
+    pay the per-chunk Python overhead thousands of times.
+    """
+
+    def __init__(self, client, url, partial_path=None, progress=None, label=None,
+                 chunk_size=DOWNLOAD_MIN_CHUNK_SIZE, max_retries=DOWNLOAD_MAX_RETRIES):
+        self.client = client
+        self.url = url
+        self.partial_path = partial_path
+        self.meta_path = partial_path.with_name(
+            partial_path.name + ".json") if partial_path else None
+        self.progress = progress
+        self.label = label
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.total_size = 0
+        self.downloaded_size = 0
+        self._sha256 = hashlib.sha256()
+        self._buffer = b""
+        self._validators = {}
+        self._replay = None
+        self._replay_size = 0
+        self._sink = None
+        self._chunks = iter(())
+        self._open()
+
+    def _load_meta(self):
+        if not self.meta_path or not self.partial_path.is_file():
+            return None
+        try:
+            meta = json.loads(self.meta_path.read_text())
+        except (OSError, json.JSONDecodeError):
+            return None
+        return meta if meta.get("url") == self.url else None
+
+    def _save_meta(self):
+        if self.meta_path:
+            self.meta_path.write_text(json.dumps(
+                {"url": self.url, "total_size": self.total_size, **self._validators}))
+
+    def _request(self, offset):
+        headers = {}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            validator = self._validators.get(
+                "etag") or self._validators.get("last_modified")
+            if validator:
+                headers["If-Range"] = validator
+        response = self.client.get(
+            self.url, headers=headers, allow_redirects=True, stream=True)
+        check_rate_limit(response)
+        if offset and response.status_code == 416:
+            # The partial file doesn't fit the file on the server anymore
+            response.close()
+            return None
+        response.raise_for_status()
+        return response
+
+    def _discard_partial(self):
+        for f in (self._replay, self._sink):
+            if f:
+                f.close()
+        self._replay = self._sink = None
+        for path in (self.partial_path, self.meta_path):
+            if path:
+                path.unlink(missing_ok=True)
+
+    def _update_validators(self, response):
+        """Remembers the validators of a full response, fails if the file changed."""
+        validators = {"etag": response.headers.get("ETag"),
+                      "last_modified": response.headers.get("Last-Modified")}
+        old_etag = self._validators.get("etag")
+        if old_etag and validators["etag"] and old_etag != validators["etag"] and self.downloaded_size:
+            raise IOError(get_string("download_changed", name=self.label))
+        self._validators = validators
+
+    def _open(self):
+        meta = self._load_meta()
+        offset = self.partial_path.stat().st_size if meta else 0
+        if meta:
+            self._validators = {k: meta.get(k)
+                                for k in ("etag", "last_modified")}
+            self.total_size = meta.get("total_size", 0)
+
+        if meta and offset and offset == self.total_size:
+            # Already complete, e.g. the previous run died right after the download
+            response = None
+        else:
+            response = self._request(offset)
+            if response is None:
+                self._discard_partial()
+                offset, self._validators, self.total_size = 0, {}, 0
+                response = self._request(0)
+
+        if response is not None and response.status_code == 206:
+            self._info(get_string("download_resuming", name=self.label,
+                                  size=f"{offset / (1024 * 1024):.1f}"))
+            content_range = response.headers.get("Content-Range", "")
+            if "/" in content_range and content_range.rsplit("/", 1)[1].isdigit():
+                self.total_size = int(content_range.rsplit("/", 1)[1])
+        elif response is not None:
+            offset = 0
+            self._update_validators(response)
+            self.total_size = int(response.headers.get('content-length', 0))
+
+        if self.partial_path:
+            if offset:
+                self._replay = open(self.partial_path, 'rb')
+                self._replay_size = offset
+            self._sink = open(self.partial_path, 'ab' if offset else 'wb')
+            self._save_meta()
+        if response is not None:
+            self._chunks = self._iter_response(response)
+        if self.progress:
+            self.progress.set_total(self.label, self.total_size)
+
+    def _info(self, message):
+        if self.progress:
+            self.progress.write(f"{C.BOLD}{get_string('info_prefix')}{C.ENDC}{message}")
+        else:
+            print_info(message)
+
+    def _warning(self, message):
+        # Warnings go to stderr like print_warning, the progress bars stay on stdout
+        if self.progress:
+            self.progress.write(f"{C.WARNING}{get_string('warning_prefix')}{message}{C.ENDC}", file=sys.stderr)
+        else:
+            print_warning(message)
+
+    def _iter_response(self, response):
+        """Yields the response body in chunks whose size follows the transfer speed."""
+        from urllib3.exceptions import ProtocolError, ReadTimeoutError
+
+        while True:
+            started = time.monotonic()
+            try:
+                chunk = response.raw.read(self.chunk_size, decode_content=True)
+            except (ProtocolError, ReadTimeoutError) as e:
+                raise requests.exceptions.ChunkedEncodingError(e) from e
+            if not chunk:
+                return
+            elapsed = time.monotonic() - started
+            if len(chunk) == self.chunk_size and elapsed < 0.05:
+                self.chunk_size = min(
+                    self.chunk_size * 2, DOWNLOAD_MAX_CHUNK_SIZE)
+            elif elapsed > 0.5:
+                self.chunk_size = max(
+                    self.chunk_size // 2, DOWNLOAD_MIN_CHUNK_SIZE)
+            yield chunk
+
+    def _account(self, chunk):
+        self._sha256.update(chunk)
+        self.downloaded_size += len(chunk)
+        profiler.count("bytes_downloaded", len(chunk))
+        if self.progress and self.total_size > 0:
+            self.progress.update(self.label, self.downloaded_size)
+
+    def _resume(self):
+        """Reconnects after a broken connection and continues where we stopped."""
+        response = self._request(self.downloaded_size)
+        if response is None:
+            # Part of the file was already handed out, it can't be restarted here
+            self._discard_partial()
+            raise IOError(get_string("download_changed", name=self.label))
+        if response.status_code == 206:
+            self._chunks = self._iter_response(response)
+            return
+        # The server ignored the range and sends everything again
+        self._update_validators(response)
+        chunks = self._iter_response(response)
+        to_skip = self.downloaded_size
+        for chunk in chunks:
+            if len(chunk) >= to_skip:
+                rest = chunk[to_skip:]
+                self._chunks = itertools.chain([rest] if rest else [], chunks)
+                return
+            to_skip -= len(chunk)
+        raise IOError(get_string("download_incomplete", name=self.label))
+
+    def _next_chunk(self):
+        if self._replay:
+            chunk = self._replay.read(
+                min(self.chunk_size, self._replay_size - self.downloaded_size))
+            if chunk:
+                self._account(chunk)
+                return chunk
+            self._replay.close()
+            self._replay = None
+
+        attempt = 0
+        reconnect = False
+        while True:
+            try:
+                # Reconnecting is part of the attempt, a network that's still down is retried as well
+                if reconnect:
+                    self._resume()
+                    reconnect = False
+                for chunk in self._chunks:
+                    if not chunk:
+                        continue
+                    if self._sink:
+                        self._sink.write(chunk)
+                    self._account(chunk)
+                    return chunk
+                if not self.total_size or self.downloaded_size >= self.total_size:
+                    self._finish()
+                    return b""
+                # The connection was closed before everything arrived
+                raise requests.exceptions.ChunkedEncodingError(
+                    get_string("download_incomplete", name=self.label))
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                delay = 2 ** (attempt - 1)
+                self._warning(get_string("download_retrying", name=self.label, delay=delay,
+                                         attempt=attempt, max_attempts=self.max_retries))
+                if self._sink:
+                    self._sink.flush()
+                time.sleep(delay)
+                reconnect = True
+
+    def _finish(self):
+        if self.progress:
+            self.progress.finish(self.label)
+        if self._sink:
+            self._sink.close()
+            self._sink = None
+        if self.meta_path:
+            try:
+                self.meta_path.unlink()
+            except OSError:
+                pass
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            self.drain()
+            data, self._buffer = self._buffer, b""
+            return data
+        while len(self._buffer) < size:
+            chunk = self._next_chunk()
+            if not chunk:
+                break
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def drain(self):
+        """Reads the rest of the download without handing it out."""
+        while self._next_chunk():
+            pass
+
+    def close(self):
+        """Closes open files, the partial download stays where it is for a later resume."""
+        for f in (self._replay, self._sink):
+            if f:
+                f.close()
+        self._replay = self._sink = None
+
+    def hexdigest(self):
+        return self._sha256.hexdigest()
+
+
+def download_file(url, client, dest_path, progress=None, label=None):
+    """Downloads to `dest_path` (resuming what's already there) and returns the SHA-256 of the content."""
+    reader = DownloadReader(client, url, dest_path, progress, label)
+    try:
+        reader.drain()
+    finally:
+        reader.close()
+    return reader.hexdigest()
+
+
+def extract_tar_stream(tar, dest_dir, strip_components=0, manifest=None):
+    """Extracts a tarfile opened in stream mode ("r|gz") member by member.
+
+    The first `strip_components` path components of every member are dropped
+    on the fly, members that don't have anything left are skipped. Regular
+    files are handed to `manifest` (an `InstallManifest`) if one is given.
+    """
+    for member in tar:
+        if strip_components:
+            new_parts = Path(member.name).parts[strip_components:]
+            if not new_parts:
+                continue
+            member.name = str(Path(*new_parts))
+        if manifest is not None and member.isreg():
+            if sys.version_info >= (3, 12):
+                member = tarfile.tar_filter(member, str(dest_dir))
+            elif member.name.startswith("/") or ".." in Path(member.name).parts:
+                raise tarfile.TarError(get_string("install_unsafe_member", name=member.name))
+            manifest.extract_file(tar, member)
+        elif sys.version_info >= (3, 12):
+            tar.extract(member, path=dest_dir, filter="tar")
+        else:
+            tar.extract(member, path=dest_dir)
+
+
+class InstallManifest:
+    """Per-file SHA-256 digests of an installation, recorded while extracting.
+
+    Files are hashed as they stream out of the archive and written through a
+    temporary file and a rename, so hardlinks to an older version (backups,
+    other staged versions) never see the new content. Given the manifest of
+    the installation being updated (`previous`), files with the same size
+    and digest are left alone instead of being written again.
+    """
+
+    def __init__(self, dest_dir, previous=None):
+        self.dest_dir = dest_dir
+        self.previous = previous or {}
+        self.files = {}
+        self.written = 0
+        self.unchanged = 0
+        self.removed = 0
+        self.bytes_written = 0
+        self._lock = threading.Lock()
+
+    def extract_file(self, tar, member):
+        relative = Path(member.name).as_posix()
+        target = self.dest_dir / relative
+        target.parent.mkdir(parents=True, exist_ok=True)
+        mode = member.mode & 0o777
+        previous = self.previous.get(relative)
+        # Only a file with the same size can turn out to be unchanged, hold
+        # those back until the digest is known and write everything else directly
+        maybe_unchanged = previous is not None and previous["size"] == member.size and \
+            previous.get("mode", mode) == mode and target.is_file() and \
+            target.stat().st_size == member.size
+        sha256 = hashlib.sha256()
+        source = tar.extractfile(member)
+        tmp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        try:
+            with (tempfile.SpooledTemporaryFile(max_size=DELTA_SPOOL_SIZE) if maybe_unchanged
+                  else open(tmp_path, "wb")) as f:
+                while chunk := source.read(DOWNLOAD_MAX_CHUNK_SIZE):
+                    sha256.update(chunk)
+                    f.write(chunk)
+                digest = sha256.hexdigest()
+                entry = {"sha256": digest, "size": member.size, "mode": mode}
+                if maybe_unchanged and digest == previous["sha256"]:
+                    with self._lock:
+                        self.files[relative] = entry
+                        self.unchanged += 1
+                    return
+                if maybe_unchanged:
+                    f.seek(0)
+                    with open(tmp_path, "wb") as out:
+                        shutil.copyfileobj(f, out, DOWNLOAD_MAX_CHUNK_SIZE)
+            os.chmod(tmp_path, mode)
+            os.replace(tmp_path, target)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        with self._lock:
+            self.files[relative] = entry
+            self.written += 1
+            self.bytes_written += member.size
+        profiler.count("bytes_written", member.size)
+
+    def remove_stale(self):
+        """Deletes files of the previous installation that the new one doesn't have."""
+        for relative in self.previous:
+            if relative not in self.files:
+                with contextlib.suppress(FileNotFoundError):
+                    (self.dest_dir / relative).unlink()
+                    self.removed += 1
+
+
+def manifest_from_dir(directory):
+    """Hashes the files of an installation that has no manifest in its `.version` yet."""
+    files = {}
+    for path in sorted(directory.rglob("*")):
+        relative = path.relative_to(directory).as_posix()
+        if path.is_symlink() or not path.is_file() or relative == ".version":
+            continue
+        path_stat = path.stat()
+        files[relative] = {"sha256": hash_file(path), "size": path_stat.st_size,
+                           "mode": stat.S_IMODE(path_stat.st_mode)}
+    return files
+
+
+def load_install_manifest(install_dir):
+    """Returns the file manifest of an installation, hashing it if `.version` has none."""
+    try:
+        files = json.loads((install_dir / ".version").read_text()).get("files")
+    except (OSError, json.JSONDecodeError, AttributeError):
+        files = None
+    return files if files is not None else manifest_from_dir(install_dir)
+
+
+def write_version_file(install_dir, version_data):
+    """Writes `.version` through a rename, the old one may be hardlinked into a backup."""
+    tmp_path = install_dir / f".version.{os.getpid()}.tmp"
+    tmp_path.write_text(json.dumps(version_data, indent=4))
+    os.replace(tmp_path, install_dir / ".version")
+
+
+def link_or_copy(source, destination):
+    """`copy_function` for `shutil.copytree` that hardlinks where possible."""
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+    return destination
+
+
+def download_artifact(name, url, client, tmp_path, store=None, key=None, progress=None, expected_sha256=None):
+    """Downloads a file, moves it into the artifact store (if any) and returns its path and SHA-256.
+
+    The digest is computed while downloading and checked against `expected_sha256`
+    if GitHub provided one, a mismatching download is discarded.
+    """
+    # Only downloads that end up in the store are worth resuming in a later run
+    dest_path = partial_download_path(
+        url) if store is not None else tmp_path / f"{name}.download"
+    sha256 = download_file(url, client, dest_path, progress, name)
+    check_digest(name, expected_sha256, sha256, dest_path)
+    if store is not None and key:
+        return store.add(key, dest_path, sha256), sha256
+    return dest_path, sha256
+
+
+def check_digest(name, expected_sha256, sha256, path=None):
+    """Raises an IOError (and deletes `path`) if a digest doesn't match the expected one."""
+    if not expected_sha256:
+        return
+    if sha256 != expected_sha256:
+        if path:
+            Path(path).unlink(missing_ok=True)
+        raise IOError(get_string("install_digest_mismatch", name=name,
+                                 expected=expected_sha256[:12], actual=sha256[:12]))
+    print_info(get_string("install_digest_verified",
                name=f"{C.OKCYAN}{name}{C.ENDC}"))
-    dl_response = requests.get(
-        url, headers=headers, allow_redirects=True, stream=True)
-    check_rate_limit(dl_response)
-    dl_response.raise_for_status()
-    total_size = int(dl_response.headers.get('content-length', 0))
-    zip_path = tmp_path / f"{name}.zip"
-
-    with open(zip_path, 'wb') as f:
-        if total_size > 0:
-            print_progress_bar(0, total_size, prefix=f"{C.OKGREEN}{get_string('progress_prefix')}{C.ENDC}", suffix=get_string(
-                'progress_suffix'), length=40)
-        downloaded_size = 0
-        for chunk in dl_response.iter_content(chunk_size=8192):
-            f.write(chunk)
-            downloaded_size += len(chunk)
-            if total_size > 0:
-                print_progress_bar(downloaded_size, total_size, prefix=f"{C.OKGREEN}{get_string('progress_prefix')}{C.ENDC}", suffix=get_string(
-                    'progress_suffix'), length=40)
-    sys.stdout.write('\n')
-    sys.stdout.flush()
 
+
+def lookup_artifact(name, store=None, key=None, digest=None):
+    """Returns the stored path of a download, or None if it has to be downloaded."""
+    cached_path = store.lookup(
+        key, digest) if store is not None and key else None
+    if cached_path:
+        print_info(get_string("install_cached_artifact",
+                   name=f"{C.OKCYAN}{name}{C.ENDC}"))
+    else:
+        print_info(get_string("install_downloading",
+                   name=f"{C.OKCYAN}{name}{C.ENDC}"))
+    return cached_path
+
+
+def fetch_artifact(name, url, client, tmp_path, store=None, key=None, zip_path=None,
+                   progress=None, expected_sha256=None):
+    """Downloads a build artifact unless `zip_path` is already known, returns its path and SHA-256."""
+    if zip_path is not None:
+        # Blobs in the artifact store are named after their digest
+        return zip_path, Path(zip_path).name
+    with profiler.span(f"download {name}"):
+        return download_artifact(name, url, client, tmp_path, store, key, progress, expected_sha256)
+
+
+def extract_artifact(name, zip_path, tmp_path, yabridge_dir, manifest=None):
+    """Extracts the .tar.gz inside an artifact zip straight from the zip, without temporary files."""
     if not zipfile.is_zipfile(zip_path):
         raise IOError(get_string("install_not_zip", name=name))
     with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        zip_ref.extractall(tmp_path / f"{name}_ext")
-    tar_path = next((tmp_path / f"{name}_ext").glob('*.tar.gz'), None)
-    if not tar_path:
-        raise IOError(get_string("install_no_tar", name=name))
+        tar_name = next((n for n in zip_ref.namelist()
+                        if n.endswith('.tar.gz')), None)
+        if not tar_name:
+            raise IOError(get_string("install_no_tar", name=name))
+        with zip_ref.open(tar_name) as tar_stream, tarfile.open(fileobj=tar_stream, mode="r|gz") as tar:
+            extract_tar_stream(tar, yabridge_dir, strip_components=1, manifest=manifest)
+
+
+def fetch_stable_tarball(asset, client, tmp_path, store=None):
+    """Returns the path and SHA-256 of a verified release tarball, or (None, None) if it should be streamed.
+
+    If GitHub published a digest for the tarball, it's downloaded and checked
+    before the installation is touched, so a corrupted download never ends
+    up in it. Without a digest there's nothing to check and the tarball is
+    extracted while it's being downloaded instead.
+    """
+    name = asset["name"]
+    key = f"asset-{name}"
+    expected_sha256 = parse_digest(asset.get("digest"))
+    tar_path = lookup_artifact(
+        name, store, key, expected_sha256)
+    if tar_path is not None:
+        # Blobs in the artifact store are named after their digest
+        return tar_path, tar_path.name
+    if not expected_sha256:
+        return None, None
+    with profiler.span(f"download {name}"):
+        return download_artifact(name, asset["browser_download_url"], client, tmp_path,
+                                 store, key, ProgressDisplay([name]), expected_sha256)
 
-    with tarfile.open(tar_path, "r:gz") as tar:
-        def strip_filter(member, path):
-            try:
-                new_parts = Path(member.name).parts[1:]
-                if not new_parts:
-                    return None
-                member.name = str(Path(*new_parts))
-            except IndexError:
-                return None
-            return member
-        if sys.version_info >= (3, 12):
-            tar.extractall(path=yabridge_dir, filter=strip_filter)
-        else:
-            members = [m for m in [strip_filter(
-                m, '') for m in tar.getmembers()] if m is not None]
-            tar.extractall(path=yabridge_dir, members=members)
-
-
-def download_and_extract_stable(asset, headers, tmp_path, yabridge_dir):
-    print_info(get_string("install_downloading",
-               name=f"{C.OKCYAN}{asset['name']}{C.ENDC}"))
-    url = asset["browser_download_url"]
-    dl_response = requests.get(
-        url, headers=headers, allow_redirects=True, stream=True)
-    check_rate_limit(dl_response)
-    dl_response.raise_for_status()
-    total_size = int(dl_response.headers.get('content-length', 0))
-    tar_path = tmp_path / asset["name"]
-
-    with open(tar_path, 'wb') as f:
-        if total_size > 0:
-            print_progress_bar(0, total_size, prefix=f"{C.OKGREEN}{get_string('progress_prefix')}{C.ENDC}", suffix=get_string(
-                'progress_suffix'), length=40)
-        downloaded_size = 0
-        for chunk in dl_response.iter_content(chunk_size=8192):
-            f.write(chunk)
-            downloaded_size += len(chunk)
-            if total_size > 0:
-                print_progress_bar(downloaded_size, total_size, prefix=f"{C.OKGREEN}{get_string('progress_prefix')}{C.ENDC}", suffix=get_string(
-                    'progress_suffix'), length=40)
-    sys.stdout.write('\n')
-    sys.stdout.flush()
-
-    if not tarfile.is_tarfile(tar_path):
-        raise IOError(get_string("install_no_tar", name=asset["name"]))
-
-    with tarfile.open(tar_path, "r:gz") as tar:
-        tar.extractall(path=yabridge_dir)
-
-
-def perform_installation(artifacts_url, headers, yabridge_dir, remote_version, branch_name):
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmp_path = Path(tmpdir)
-        print_header(get_string("install_preparing"))
-        print_info(get_string("install_getting_artifacts"))
-        response = requests.get(artifacts_url, headers=headers)
-        check_rate_limit(response)
-        response.raise_for_status()
-        artifacts = response.json()["artifacts"]
 
-        ctl_artifact = next(
-            (a for a in artifacts if a["name"].startswith("yabridgectl")), None)
-        libs_artifact = next(
-            (a for a in artifacts if a["name"].startswith("yabridge-")), None)
-        if not ctl_artifact or not libs_artifact:
-            raise ValueError(get_string("install_no_artifacts_url"))
+def download_and_extract_stable(asset, client, tmp_path, yabridge_dir, store=None, manifest=None,
+                                tar_path=None, sha256=None):
+    """Extracts a release tarball from `tar_path`, or while it is being downloaded if that's None.
 
-        backup_base_dir = yabridge_dir.parent / "yabridge-backups"
-        if yabridge_dir.exists():
-            backup_base_dir.mkdir(exist_ok=True)
-            backup_dir = backup_base_dir / \
-                f"yabridge-backup-{datetime.datetime.now().strftime('%F-%H%M%S')}"
-            print_info(get_string("install_backing_up",
-                       backup_dir=f"{C.OKCYAN}{backup_dir}{C.ENDC}"))
-            shutil.move(str(yabridge_dir), str(backup_dir))
-        yabridge_dir.mkdir(parents=True, exist_ok=True)
+    Returns the SHA-256 of the tarball.
+    """
+    name = asset["name"]
+    key = f"asset-{name}"
+    try:
+        if tar_path is not None:
+            with open(tar_path, 'rb') as f, tarfile.open(fileobj=f, mode="r|gz") as tar:
+                extract_tar_stream(tar, yabridge_dir, manifest=manifest)
+            return sha256
+
+        # The tarball only needs to hit the disk if it's kept in the store
+        url = asset["browser_download_url"]
+        dest_path = partial_download_path(url) if store is not None else None
+        reader = DownloadReader(client, url, dest_path,
+                                ProgressDisplay([name]), name)
+        try:
+            with tarfile.open(fileobj=reader, mode="r|gz") as tar:
+                extract_tar_stream(tar, yabridge_dir, manifest=manifest)
+            # Also read the end-of-archive padding so the stored file is complete
+            reader.drain()
+        finally:
+            reader.close()
+    except tarfile.ReadError as e:
+        raise IOError(get_string("install_no_tar", name=name)) from e
+    if dest_path:
+        store.add(key, dest_path, reader.hexdigest())
+    return reader.hexdigest()
+
+
+def finish_manifest(manifest, previous):
+    """Removes files the new build doesn't have anymore and reports what a delta update did."""
+    if previous is None:
+        return
+    manifest.remove_stale()
+    print_info(get_string("install_delta_summary", written=manifest.written,
+               size=format_size(manifest.bytes_written), unchanged=manifest.unchanged,
+               removed=manifest.removed))
+
+
+def get_run_artifacts(artifacts_url, client):
+    """Returns the yabridgectl and yabridge artifacts of a workflow run as [("ctl", ...), ("libs", ...)]."""
+    response = client.get(artifacts_url)
+    check_rate_limit(response)
+    response.raise_for_status()
+    artifacts = response.json()["artifacts"]
 
-        download_and_extract(
-            "ctl", ctl_artifact["archive_download_url"], headers, tmp_path, yabridge_dir)
-        download_and_extract(
-            "libs", libs_artifact["archive_download_url"], headers, tmp_path, yabridge_dir)
+    ctl_artifact = next(
+        (a for a in artifacts if a["name"].startswith("yabridgectl")), None)
+    libs_artifact = next(
+        (a for a in artifacts if a["name"].startswith("yabridge-")), None)
+    if not ctl_artifact or not libs_artifact:
+        raise ValueError(get_string("install_no_artifacts_url"))
+    return [("ctl", ctl_artifact), ("libs", libs_artifact)]
+
+
+@profiler.span("perform_installation")
+def perform_installation(artifacts_url, client, yabridge_dir, remote_version, branch_name, store=None,
+                         backups=None, staged=False, delta=False, run_artifacts=None, save_path=True):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp_path = Path(tmpdir)
+        print_header(get_string("install_preparing"))
+        if run_artifacts is None:
+            print_info(get_string("install_getting_artifacts"))
+            with profiler.span("list artifacts"):
+                run_artifacts = get_run_artifacts(artifacts_url, client)
+
+        downloads = []
+        for name, artifact in run_artifacts:
+            key = f"artifact-{artifact['id']}"
+            zip_path = lookup_artifact(
+                name, store, key, parse_digest(artifact.get("digest")))
+            downloads.append(
+                (name, artifact["archive_download_url"], key, zip_path, parse_digest(artifact.get("digest"))))
+
+        # Both artifacts are independent, download them at the same time. They
+        # are checked against their digests before the installation is touched,
+        # so a failed or corrupted download leaves it as it is.
+        progress = ProgressDisplay(
+            [name for name, _, _, zip_path, _ in downloads if zip_path is None])
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(downloads)) as executor:
+            futures = {name: executor.submit(fetch_artifact, name, url, client, tmp_path,
+                                             store, key, zip_path, progress, digest)
+                       for name, url, key, zip_path, digest in downloads}
+            fetched = {name: future.result() for name, future in futures.items()}
+        artifact_digests = {name: sha256 for name, (_, sha256) in fetched.items()}
+
+        staged = staged or is_staged_install(yabridge_dir)
+        with profiler.span("prepare (backup)"):
+            install_dir, previous = prepare_install_dir(yabridge_dir, staged, backups, delta)
+        manifest = InstallManifest(install_dir, previous)
+        for name, (zip_path, _) in fetched.items():
+            with profiler.span(f"extract {name}"):
+                extract_artifact(name, zip_path, tmp_path, install_dir, manifest)
 
         CONFIG_DIR.mkdir(exist_ok=True)
-        version_data = {"sha": remote_version, "branch": branch_name}
-        (yabridge_dir / ".version").write_text(json.dumps(version_data, indent=4))
-        PATH_CONFIG_FILE.write_text(str(yabridge_dir))
+        with profiler.span("finalize"):
+            finish_manifest(manifest, previous)
+            write_version_file(install_dir, {"sha": remote_version, "branch": branch_name,
+                                             "artifacts": artifact_digests, "files": manifest.files})
+            if staged:
+                complete_staged_install(yabridge_dir, install_dir, remote_version, backups)
         print_success(get_string("install_update_complete",
                       version=f"{C.BOLD}{remote_version[:7]}{C.ENDC}"))
-        print_info(get_string("install_path_saved",
-                   path_file=f"{C.OKCYAN}{PATH_CONFIG_FILE}{C.ENDC}"))
+        if save_path:
+            PATH_CONFIG_FILE.write_text(str(yabridge_dir))
+            print_info(get_string("install_path_saved",
+                       path_file=f"{C.OKCYAN}{PATH_CONFIG_FILE}{C.ENDC}"))
+    # Keep the backup directory from growing without limit
+    prune_backups(yabridge_dir.parent)
 
 
-def perform_stable_installation(assets, headers, yabridge_dir, remote_version):
+@profiler.span("perform_stable_installation")
+def perform_stable_installation(assets, client, yabridge_dir, remote_version, store=None, backups=None,
+                                staged=False, delta=False):
     with tempfile.TemporaryDirectory() as tmpdir:
         tmp_path = Path(tmpdir)
         print_header(get_string("install_preparing"))
@@ -621,31 +2690,196 @@ def perform_stable_installation(assets, headers, yabridge_dir, remote_version):
         if not asset:
             raise ValueError(get_string("install_no_artifacts_url"))
 
-        backup_base_dir = yabridge_dir.parent / "yabridge-backups"
-        if yabridge_dir.exists():
-            backup_base_dir.mkdir(exist_ok=True)
-            backup_dir = backup_base_dir / \
-                f"yabridge-backup-{datetime.datetime.now().strftime('%F-%H%M%S')}"
-            print_info(get_string("install_backing_up",
-                       backup_dir=f"{C.OKCYAN}{backup_dir}{C.ENDC}"))
-            shutil.move(str(yabridge_dir), str(backup_dir))
-        yabridge_dir.mkdir(parents=True, exist_ok=True)
+        tar_path, tarball_digest = fetch_stable_tarball(asset, client, tmp_path, store)
+        staged = staged or is_staged_install(yabridge_dir)
+        with profiler.span("prepare (backup)"):
+            install_dir, previous = prepare_install_dir(yabridge_dir, staged, backups, delta)
+        manifest = InstallManifest(install_dir, previous)
+
+        with profiler.span("download + extract"):
+            tarball_digest = download_and_extract_stable(
+                asset, client, tmp_path, install_dir, store, manifest, tar_path, tarball_digest)
+        with profiler.span("finalize"):
+            finish_manifest(manifest, previous)
+            write_version_file(install_dir, {"sha": remote_version, "branch": "stable",
+                                             "artifacts": {asset["name"]: tarball_digest}, "files": manifest.files})
+            if staged:
+                complete_staged_install(yabridge_dir, install_dir, remote_version, backups)
+    prune_backups(yabridge_dir.parent)
+
+
+@profiler.span("verify_installation")
+def verify_installation(yabridge_dir, max_workers=None):
+    """Checks every file of the installation against its manifest in `.version`.
+
+    Files whose size already differs aren't hashed at all, the rest is hashed
+    in parallel across processes. Returns True if the installation is intact.
+    """
+    print_header(get_string("verify_header"))
+    try:
+        files = json.loads((yabridge_dir / ".version").read_text()).get("files")
+    except (OSError, json.JSONDecodeError, AttributeError):
+        files = None
+    if not files:
+        raise FileNotFoundError(get_string("verify_no_manifest"))
+
+    started = time.monotonic()
+    problems = []
+    to_hash = []
+    for relative, entry in sorted(files.items()):
+        path = yabridge_dir / relative
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            problems.append(get_string("verify_missing", name=relative))
+            continue
+        if size != entry["size"]:
+            problems.append(get_string("verify_modified", name=relative))
+        else:
+            to_hash.append((relative, path))
+
+    max_workers = max_workers or os.cpu_count() or 1
+    print_info(get_string("verify_checking", count=len(files), workers=max_workers))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        digests = executor.map(hash_file, [path for _, path in to_hash])
+        for (relative, _), digest in zip(to_hash, digests):
+            if digest != files[relative]["sha256"]:
+                problems.append(get_string("verify_modified", name=relative))
+
+    for path in sorted(yabridge_dir.rglob("*")):
+        relative = path.relative_to(yabridge_dir).as_posix()
+        if path.is_file() and not path.is_symlink() and relative not in files and relative != ".version":
+            print_warning(get_string("verify_unexpected", name=relative))
+
+    for problem in problems:
+        print_error(problem)
+    if problems:
+        print_error(get_string("verify_failed", count=len(problems)))
+        return False
+    print_success(get_string("verify_ok", count=len(files),
+                  seconds=f"{time.monotonic() - started:.2f}"))
+    return True
+
+
+def yabridgectl_plugin_dirs():
+    """Returns the plugin directories from yabridgectl's config, or None if they can't be read."""
+    if tomllib is None:
+        return None
+    try:
+        with YABRIDGECTL_CONFIG_FILE.open("rb") as f:
+            config = tomllib.load(f)
+    except FileNotFoundError:
+        return []
+    except (OSError, tomllib.TOMLDecodeError):
+        return None
+    return [Path(p).expanduser() for p in config.get("plugin_dirs", [])]
+
+
+def scan_tree(root, entries):
+    """Appends (path, size, mtime_ns) of `root` and everything below it to `entries`."""
+    try:
+        st = os.stat(root)
+    except OSError:
+        entries.append((str(root), -1, 0))
+        return
+    entries.append((str(root), st.st_size, st.st_mtime_ns))
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    entries.append((entry.path, st.st_size, st.st_mtime_ns))
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+        except (NotADirectoryError, PermissionError, FileNotFoundError):
+            continue
+
+
+def sync_fingerprint(yabridge_dir):
+    """Fingerprints the installed files, yabridgectl's config and the plugin directories.
+
+    Only sizes and modification times are looked at, so this is cheap even for
+    large plugin collections. Returns (fingerprint, number of entries), or
+    (None, 0) if the plugin directories are unknown.
+    """
+    plugin_dirs = yabridgectl_plugin_dirs()
+    if plugin_dirs is None:
+        return None, 0
+    entries = []
+    # `.version` changes with every install, the files themselves are what matters
+    scan_tree(os.path.realpath(yabridge_dir), entries)
+    entries = [e for e in entries if Path(e[0]).name != ".version"]
+    scan_tree(str(YABRIDGECTL_CONFIG_FILE), entries)
+    for plugin_dir in plugin_dirs:
+        scan_tree(str(plugin_dir), entries)
+    digest = hashlib.sha256(json.dumps(sorted(entries)).encode()).hexdigest()
+    return digest, len(entries)
+
+
+def load_sync_state():
+    try:
+        return json.loads(SYNC_STATE_FILE.read_text())
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_sync_state(state):
+    CONFIG_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_file = SYNC_STATE_FILE.with_suffix(".tmp")
+    tmp_file.write_text(json.dumps(state, indent=2))
+    os.replace(tmp_file, SYNC_STATE_FILE)
 
-        download_and_extract_stable(asset, headers, tmp_path, yabridge_dir)
-        (yabridge_dir / ".version").write_text(json.dumps(
-            {"sha": remote_version, "branch": "stable"}, indent=4))
 
+@profiler.span("run_sync")
+def run_sync(yabridgectl_path, force=False, only_if_changed=False):
+    """Runs `yabridgectl sync --prune` unless nothing changed since the last sync.
 
-def run_sync(yabridgectl_path):
+    Returns "ran" or "skipped". The fingerprint is taken after the sync, as yabridgectl itself writes
+    into the plugin directories. If the fingerprint can't be taken, the sync runs after installs and
+    restores, but not with `only_if_changed` (nothing was installed, e.g. already up to date).
+    """
     print_header(get_string("sync_header"))
+    yabridge_dir = yabridgectl_path.parent
+    state_key = str(yabridge_dir)
+    state = load_sync_state()
+    if not force and (state_key in state or only_if_changed):
+        started = time.monotonic()
+        fingerprint, count = sync_fingerprint(yabridge_dir)
+        print_info(get_string("sync_fingerprint_time", count=count,
+                   seconds=f"{time.monotonic() - started:.2f}"))
+        if fingerprint is None and only_if_changed:
+            print_info(get_string("sync_skipped_unknown"))
+            return "skipped"
+        if fingerprint is not None and fingerprint == state.get(state_key, {}).get("fingerprint"):
+            print_info(get_string("sync_skipped"))
+            return "skipped"
+
     command_str = f"{yabridgectl_path} sync --prune"
     print_info(get_string("sync_running",
                command=f"{C.OKCYAN}{command_str}{C.ENDC}"))
     if not yabridgectl_path.exists():
         raise FileNotFoundError(get_string("sync_not_found"))
-    subprocess.run([str(yabridgectl_path), "sync", "--prune"], check=True)
+    started = time.monotonic()
+    # With --json, sys.stdout points to stderr and yabridgectl's output has to follow it
+    subprocess.run([str(yabridgectl_path), "sync", "--prune"], check=True,
+                   stdout=sys.stderr if sys.stdout is sys.stderr else None)
+    print_info(get_string("sync_finished",
+               seconds=f"{time.monotonic() - started:.2f}"))
+
+    fingerprint, _ = sync_fingerprint(yabridge_dir)
+    if fingerprint is None:
+        state.pop(state_key, None)
+    else:
+        state[state_key] = {"fingerprint": fingerprint, "synced_at": time.time()}
+    save_sync_state(state)
+    return "ran"
 
 
+@profiler.span("check_and_update_path")
 def check_and_update_path(yabridge_dir):
     print_header(get_string("path_header"))
     install_path_str = str(yabridge_dir)
@@ -673,8 +2907,7 @@ def check_and_update_path(yabridge_dir):
             return
 
         print_warning(get_string("path_needs_adding", path=install_path_str))
-        prompt = f"{C.WARNING}{get_string('path_add_prompt', config_file=config_file)}{C.ENDC} "
-        if input(prompt).lower().strip() in ["j", "ja", "y", "yes"]:
+        if confirm(get_string('path_add_prompt', config_file=config_file)):
             with config_file.open("a") as f:
                 f.write(f"\n# Added by yabridge-updater\n{line_to_add}\n")
             print_success(get_string(
@@ -686,76 +2919,221 @@ def check_and_update_path(yabridge_dir):
                       shell_name=shell_name, path=install_path_str))
 
 
-def prune_backups(backup_parent_dir, keep_count):
+def load_retention_policy():
+    """Returns the saved retention policy, or the default of keeping the last 5 backups."""
+    try:
+        return json.loads(RETENTION_CONFIG_FILE.read_text())
+    except (OSError, json.JSONDecodeError):
+        return dict(DEFAULT_RETENTION_POLICY)
+
+
+def save_retention_policy(policy):
+    CONFIG_DIR.mkdir(parents=True, exist_ok=True)
+    RETENTION_CONFIG_FILE.write_text(json.dumps(policy, indent=4))
+
+
+def select_backups_to_prune(entries, policy, now=None):
+    """Applies a retention policy to catalog entries (newest first).
+
+    A backup is kept if any of the keep rules (`keep_last`, `keep_per_branch`,
+    `keep_daily`, `keep_weekly`, `keep_monthly`) selects it; without keep rules
+    every backup is kept. `max_age_days` and `max_size_mb` then drop kept
+    backups that are too old or don't fit into the size budget anymore. The
+    size budget counts blobs shared between deduplicated backups only once.
+    The most recent backup is never deleted by the age rule. Returns a list of
+    `(entry, reason)` tuples for the backups to delete.
+    """
+    now = now or time.time()
+    keep_rules = ("keep_last", "keep_per_branch", "keep_daily", "keep_weekly", "keep_monthly")
+    if any(policy.get(rule) is not None for rule in keep_rules):
+        kept = set()
+        kept.update(entry["name"] for entry in entries[:policy.get("keep_last") or 0])
+        if policy.get("keep_per_branch"):
+            per_branch = {}
+            for entry in entries:
+                branch_entries = per_branch.setdefault(entry["branch"], [])
+                if len(branch_entries) < policy["keep_per_branch"]:
+                    branch_entries.append(entry["name"])
+                    kept.add(entry["name"])
+        # Grandfather-father-son: the newest backup of each of the last N days/weeks/months
+        for rule, period in (("keep_daily", "%Y-%m-%d"), ("keep_weekly", "%G-%V"), ("keep_monthly", "%Y-%m")):
+            seen_periods = set()
+            for entry in entries:
+                if len(seen_periods) >= (policy.get(rule) or 0):
+                    break
+                entry_period = datetime.datetime.fromtimestamp(entry["created"] or 0).strftime(period)
+                if entry_period not in seen_periods:
+                    seen_periods.add(entry_period)
+                    kept.add(entry["name"])
+        prune = [(entry, get_string("retention_unselected"))
+                 for entry in entries if entry["name"] not in kept]
+    else:
+        kept = {entry["name"] for entry in entries}
+        prune = []
+
+    max_age_days = policy.get("max_age_days")
+    if max_age_days is not None:
+        for entry in entries[1:]:
+            if entry["name"] in kept and now - (entry["created"] or 0) > max_age_days * 86400:
+                kept.discard(entry["name"])
+                prune.append((entry, get_string("retention_too_old", days=max_age_days)))
+
+    max_size_mb = policy.get("max_size_mb")
+    if max_size_mb is not None:
+        total = 0
+        counted_blobs = set()
+        for entry in entries:
+            if entry["name"] not in kept:
+                continue
+            blobs = entry.get("blobs")
+            if blobs is None:
+                total += entry["size"]
+            else:
+                total += sum(size for sha256, size in blobs.items() if sha256 not in counted_blobs)
+                counted_blobs.update(blobs)
+            if total > max_size_mb * 1024 * 1024:
+                kept.discard(entry["name"])
+                prune.append((entry, get_string("retention_over_budget",
+                                                size=format_size(max_size_mb * 1024 * 1024))))
+
+    order = {entry["name"]: i for i, entry in enumerate(entries)}
+    return sorted(prune, key=lambda item: order[item[0]["name"]])
+
+
+@profiler.span("prune_backups")
+def prune_backups(backup_parent_dir, policy=None, dry_run=False):
+    """Deletes the backups that the retention policy doesn't keep (default: the saved one)."""
     backup_base_dir = backup_parent_dir / "yabridge-backups"
+    policy = policy if policy is not None else load_retention_policy()
     print_header(get_string("backup_prune_header"))
-    backups = sorted([d for d in backup_base_dir.glob("yabridge-backup-*")
-                     if d.is_dir()], key=lambda d: d.name, reverse=True)
+    print_info(get_string("backup_policy", policy=", ".join(
+        f"{key}={value}" for key, value in policy.items() if value is not None)))
+    store = BackupStore(backup_base_dir)
+    to_delete = select_backups_to_prune(store.catalog(), policy)
 
-    if len(backups) <= keep_count:
+    if not to_delete:
         print_info(get_string("backup_not_enough"))
+    elif dry_run:
+        freed = store.freed_size([backup_base_dir / entry["name"] for entry, _ in to_delete])
+        print_info(get_string("backup_dry_run", count=len(to_delete), size=format_size(freed)))
+        for entry, reason in to_delete:
+            print(f"  - {C.OKCYAN}{get_string('backup_would_delete', name=entry['name'], reason=reason)}{C.ENDC}")
         return
+    else:
+        print_info(get_string("backup_deleting", count=len(to_delete)))
+        failed = dict(store.move_to_trash([backup_base_dir / entry["name"] for entry, _ in to_delete]))
+        for entry, reason in to_delete:
+            backup_dir = backup_base_dir / entry["name"]
+            if backup_dir in failed:
+                print_error(get_string("backup_delete_failed",
+                            backup_dir=backup_dir), details=failed[backup_dir])
+            else:
+                print(
+                    f"  - {C.OKCYAN}{get_string('backup_deleted', name=backup_dir.name)}{C.ENDC} ({reason})")
 
-    to_delete = backups[keep_count:]
-    print_info(get_string("backup_deleting", count=len(to_delete)))
-    for backup_dir in to_delete:
-        try:
-            shutil.rmtree(backup_dir)
-            print(
-                f"  - {C.OKCYAN}{get_string('backup_deleted', name=backup_dir.name)}{C.ENDC}")
-        except OSError as e:
-            print_error(get_string("backup_delete_failed",
-                        backup_dir=backup_dir), details=e)
-    print_success(get_string("backup_prune_complete"))
+    # The trash also holds whatever an interrupted prune left behind
+    for path, error in store.empty_trash({entry["name"]: entry["size"] for entry, _ in to_delete}):
+        print_error(get_string("backup_delete_failed", backup_dir=path), details=error)
 
+    # Blobs can also be left over from backups that were deleted by hand
+    removed, freed = store.collect_garbage()
+    if removed:
+        print_info(get_string("backup_blobs_removed",
+                   count=removed, size=format_size(freed)))
+    if to_delete:
+        print_success(get_string("backup_prune_complete"))
 
+
+@profiler.span("restore_from_backup")
 def restore_from_backup(yabridge_dir):
     print_header(get_string("restore_header"))
     backup_base_dir = yabridge_dir.parent / "yabridge-backups"
-    backups = sorted([d for d in backup_base_dir.glob("yabridge-backup-*")
-                     if d.is_dir()], key=lambda d: d.name, reverse=True)
+    store = BackupStore(backup_base_dir)
+    entries = store.catalog()
+    backups = [backup_base_dir / entry["name"] for entry in entries]
+
+    # Inactive versions of a staged installation can be switched to directly
+    staged = is_staged_install(yabridge_dir)
+    active = active_version_dir(yabridge_dir)
+    versions = [path for path in list_staged_versions(yabridge_dir)
+                if staged and path.name != active.name]
 
-    if not backups:
+    if not backups and not versions:
         raise FileNotFoundError(get_string("restore_no_backups"))
 
     print(f"\n{C.BOLD}{get_string('restore_available_header')}{C.ENDC}")
-    for i, backup in enumerate(backups, 1):
+    for i, version_dir in enumerate(versions, 1):
         version_str = ""
-        version_file_in_backup = backup / ".version"
-        if version_file_in_backup.is_file():
-            try:
-                version_data = json.loads(version_file_in_backup.read_text())
-                version_sha, version_branch = version_data.get(
-                    "sha", "N/A")[:7], version_data.get("branch", "N/A")
-                version_str = get_string(
-                    "restore_version_info", version=f"{C.OKGREEN}{version_sha}{C.ENDC}", branch=f"{C.OKCYAN}{version_branch}{C.ENDC}")
-            except json.JSONDecodeError:
-                version_str = f" {C.FAIL}{get_string('restore_invalid_version')}{C.ENDC}"
-        date_str = backup.name.replace("yabridge-backup-", "")
-        print(f"  {C.OKCYAN}{i}){C.ENDC} {date_str}{version_str}")
-
+        try:
+            version_data = json.loads((version_dir / ".version").read_text())
+            version_str = get_string("restore_version_info", version=f"{C.OKGREEN}{version_data.get('sha', 'N/A')[:7]}{C.ENDC}",
+                                     branch=f"{C.OKCYAN}{version_data.get('branch', 'N/A')}{C.ENDC}")
+        except (OSError, json.JSONDecodeError):
+            version_str = f" {C.FAIL}{get_string('restore_invalid_version')}{C.ENDC}"
+        print(f"  {C.OKCYAN}{i}){C.ENDC} {version_dir.name}{version_str} {C.OKBLUE}{get_string('restore_staged_version')}{C.ENDC}")
+    for i, (backup, entry) in enumerate(zip(backups, entries), len(versions) + 1):
+        version_str = ""
+        if entry["invalid_version"]:
+            version_str = f" {C.FAIL}{get_string('restore_invalid_version')}{C.ENDC}"
+        elif entry["sha"] or entry["branch"]:
+            version_str = get_string("restore_version_info", version=f"{C.OKGREEN}{(entry['sha'] or 'N/A')[:7]}{C.ENDC}",
+                                     branch=f"{C.OKCYAN}{entry['branch'] or 'N/A'}{C.ENDC}")
+        date_str = backup_display_name(backup).replace("yabridge-backup-", "")
+        if entry["format"] != "dir":
+            date_str += f" [{entry['format']}]"
+        print(f"  {C.OKCYAN}{i}){C.ENDC} {date_str}{version_str} {C.OKBLUE}{get_string('restore_backup_size', size=format_size(entry['size']), files=entry['files'])}{C.ENDC}")
+
+    count = len(versions) + len(backups)
     choice = -1
-    while not (1 <= choice <= len(backups)):
+    while not (1 <= choice <= count):
         try:
             choice = int(
-                input(get_string("restore_prompt", count=len(backups))))
+                input(get_string("restore_prompt", count=count)))
         except ValueError:
             pass
 
-    selected_backup = backups[choice - 1]
+    if choice <= len(versions):
+        print_info(get_string("restore_switching",
+                   name=f"{C.OKCYAN}{versions[choice - 1].name}{C.ENDC}"))
+        activate_version(yabridge_dir, versions[choice - 1])
+        print_success(get_string("restore_success"))
+        return
+
+    selected_backup = backups[choice - len(versions) - 1]
     print_info(get_string("restore_restoring",
                name=f"{C.OKCYAN}{selected_backup.name}{C.ENDC}"))
 
-    backup_base_dir.mkdir(exist_ok=True)
+    if staged:
+        # The active version stays where it is, no pre-restore backup needed
+        selected_entry = entries[choice - len(versions) - 1]
+        version_name = selected_entry["sha"] or backup_display_name(selected_backup)
+        version_dir = staged_versions_dir(yabridge_dir) / version_name
+        suffix = 1
+        while version_dir.exists():
+            suffix += 1
+            version_dir = version_dir.with_name(f"{version_name}-{suffix}")
+        try:
+            store.restore(selected_backup, version_dir)
+        except OSError as e:
+            print_error(get_string("restore_failed"), details=e)
+            sys.exit(1)
+        activate_version(yabridge_dir, version_dir)
+        retire_old_versions(yabridge_dir, store)
+        print_success(get_string("restore_success"))
+        return
+
     if yabridge_dir.exists():
-        pre_restore_backup_dir = backup_base_dir / \
-            f"yabridge-pre-restore-backup-{datetime.datetime.now().strftime('%F-%H%M%S')}"
+        pre_restore_backup_dir = store.new_backup_dir("yabridge-pre-restore-backup")
         print_info(get_string("restore_pre_backup",
                    backup_dir=f"{C.OKCYAN}{pre_restore_backup_dir}{C.ENDC}"))
         shutil.move(str(yabridge_dir), str(pre_restore_backup_dir))
+        try:
+            store.deduplicate(pre_restore_backup_dir)
+        except OSError as e:
+            print_warning(f"{e}")
 
     try:
-        shutil.move(str(selected_backup), str(yabridge_dir))
+        store.restore(selected_backup, yabridge_dir)
         if (yabridge_dir / ".version").is_file():
             print_info(get_string("restore_with_version_file"))
         print_success(get_string("restore_success"))
@@ -764,11 +3142,11 @@ def restore_from_backup(yabridge_dir):
         if 'pre_restore_backup_dir' in locals() and pre_restore_backup_dir.exists():
             print_info(get_string("restore_reverting"))
             # No need to call check_and_update_path here, as the path hasn't changed.
-            shutil.move(str(pre_restore_backup_dir), str(yabridge_dir))
+            store.restore(pre_restore_backup_dir, yabridge_dir)
         sys.exit(1)
 
 
-def perform_self_update():
+def perform_self_update(client):
     """Checks for a new version of this script and updates it."""
     print_header(get_string("self_update_header"))
 
@@ -783,7 +3161,7 @@ def perform_self_update():
     latest_content = None
     for branch in branches_to_try:
         url = f"https://raw.githubusercontent.com/{UPDATER_REPO}/{branch}/{UPDATER_SOURCE_FILENAME}"
-        response = requests.get(url)
+        response = client.get(url)
         if response.status_code == 200:
             latest_content = response.text
             break
@@ -804,7 +3182,7 @@ def perform_self_update():
         return
 
     print_info(get_string("self_update_available"))
-    if input(f"{C.WARNING}{get_string('install_now_prompt')}{C.ENDC} ").lower().strip() in ["", "j", "ja", "y", "yes"]:
+    if confirm(get_string('install_now_prompt'), default=True):
         # Preserve the shebang from the currently installed script
         current_shebang = current_content.splitlines()[0]
         if current_shebang.startswith("#!"):
@@ -831,6 +3209,28 @@ def handle_arguments():
         description=get_string("argparse_description"), formatter_class=argparse.RawTextHelpFormatter)
     parser.add_argument("--install-path", type=Path, default=None,
                         help=get_string("argparse_install_path_help"))
+    parser.add_argument("--no-cache", action="store_true",
+                        help=get_string("argparse_no_cache_help"))
+    parser.add_argument("--artifact-cache-size", type=int, default=ARTIFACT_STORE_MAX_MB, metavar="MB",
+                        help=get_string("argparse_artifact_cache_size_help"))
+    parser.add_argument("--artifact-cache-max-age", type=int, default=ARTIFACT_STORE_MAX_AGE_DAYS, metavar="DAYS",
+                        help=get_string("argparse_artifact_cache_age_help"))
+    parser.add_argument("-y", "--yes", action="store_true",
+                        help=get_string("argparse_yes_help"))
+    parser.add_argument("--json", action="store_true",
+                        help=get_string("argparse_json_help"))
+    parser.add_argument("--lock-timeout", type=float, default=LOCK_TIMEOUT_SECONDS, metavar="SECONDS",
+                        help=get_string("argparse_lock_timeout_help"))
+    parser.add_argument("--profile", action="store_true",
+                        help=get_string("argparse_profile_help"))
+    parser.add_argument("--metrics-log", action="store_true",
+                        help=get_string("argparse_metrics_log_help"))
+    parser.add_argument("--force-sync", action="store_true",
+                        help=get_string("argparse_force_sync_help"))
+    parser.add_argument("--backup-format", choices=["dir", *BACKUP_ARCHIVE_SUFFIXES], default="dir",
+                        help=get_string("argparse_backup_format_help"))
+    parser.add_argument("--backup-compression-level", type=int, default=None, metavar="LEVEL",
+                        help=get_string("argparse_backup_level_help"))
     subparsers = parser.add_subparsers(
         dest="command", title=get_string("argparse_commands_title"))
 
@@ -838,6 +3238,20 @@ def handle_arguments():
         "update", help=get_string("argparse_update_help"))
     update_parser.add_argument("--interactive", action="store_true",
                                help=get_string("argparse_interactive_help"))
+    update_parser.add_argument("--all", action="store_true",
+                               help=get_string("argparse_update_all_help"))
+    update_parser.add_argument("--channel", choices=["stable", "dev"], default=None,
+                               help=get_string("argparse_channel_help"))
+    update_parser.add_argument("--branch", default=None,
+                               help=get_string("argparse_branch_help"))
+    update_parser.add_argument("--staged", action="store_true",
+                               help=get_string("argparse_staged_help"))
+    update_parser.add_argument("--delta", action="store_true",
+                               help=get_string("argparse_delta_help"))
+    update_parser.add_argument("--discovery", choices=["runs", "probe"], default="runs",
+                               help=get_string("argparse_discovery_help"))
+    update_parser.add_argument("--jobs", type=int, default=DEFAULT_PROBE_WORKERS,
+                               help=get_string("argparse_jobs_help"))
     subparsers.add_parser(
         "sync", help=get_string("argparse_sync_help"))
     subparsers.add_parser(
@@ -846,24 +3260,90 @@ def handle_arguments():
         "restore", help=get_string("argparse_restore_help"))
     prune_parser = subparsers.add_parser(
         "prune-backups", help=get_string("argparse_prune_help"))
-    prune_parser.add_argument("keep", type=int, nargs="?", default=5,
+    prune_parser.add_argument("keep", type=int, nargs="?", default=None,
                               help=get_string("argparse_keep_help"))
+    prune_parser.add_argument("--max-size", type=int, default=None, metavar="MB",
+                              help=get_string("argparse_max_size_help"))
+    prune_parser.add_argument("--max-age", type=int, default=None, metavar="DAYS",
+                              help=get_string("argparse_max_age_help"))
+    prune_parser.add_argument("--keep-per-branch", type=int, default=None, metavar="N",
+                              help=get_string("argparse_keep_per_branch_help"))
+    prune_parser.add_argument("--keep-daily", type=int, default=None, metavar="N",
+                              help=get_string("argparse_keep_daily_help"))
+    prune_parser.add_argument("--keep-weekly", type=int, default=None, metavar="N",
+                              help=get_string("argparse_keep_weekly_help"))
+    prune_parser.add_argument("--keep-monthly", type=int, default=None, metavar="N",
+                              help=get_string("argparse_keep_monthly_help"))
+    prune_parser.add_argument("--dry-run", action="store_true",
+                              help=get_string("argparse_dry_run_help"))
+    prune_parser.add_argument("--save", action="store_true",
+                              help=get_string("argparse_save_policy_help"))
+    check_parser = subparsers.add_parser(
+        "check", help=get_string("argparse_check_help"))
+    check_parser.add_argument("--ttl", type=int, default=CHECK_CACHE_TTL, metavar="SECONDS",
+                              help=get_string("argparse_check_ttl_help"))
+    check_parser.add_argument("-q", "--quiet", action="store_true",
+                              help=get_string("argparse_check_quiet_help"))
+    daemon_parser = subparsers.add_parser(
+        "daemon", help=get_string("argparse_daemon_help"))
+    daemon_parser.add_argument("--once", action="store_true",
+                               help=get_string("argparse_daemon_once_help"))
+    daemon_parser.add_argument("--interval", type=int, default=DAEMON_INTERVAL_MINUTES, metavar="MINUTES",
+                               help=get_string("argparse_daemon_interval_help"))
+    daemon_parser.add_argument("--jitter", type=int, default=DAEMON_JITTER_SECONDS, metavar="SECONDS",
+                               help=get_string("argparse_daemon_jitter_help"))
+    systemd_group = daemon_parser.add_mutually_exclusive_group()
+    systemd_group.add_argument("--install-systemd", action="store_true",
+                               help=get_string("argparse_daemon_install_systemd_help"))
+    systemd_group.add_argument("--remove-systemd", action="store_true",
+                               help=get_string("argparse_daemon_remove_systemd_help"))
+    verify_parser = subparsers.add_parser(
+        "verify", help=get_string("argparse_verify_help"))
+    verify_parser.add_argument("--jobs", dest="verify_jobs", type=int, default=None,
+                               help=get_string("argparse_verify_jobs_help"))
+    installs_parser = subparsers.add_parser(
+        "installs", help=get_string("argparse_installs_help"))
+    installs_subparsers = installs_parser.add_subparsers(dest="installs_action")
+    installs_subparsers.add_parser("list", help=get_string("argparse_installs_list_help"))
+    installs_add_parser = installs_subparsers.add_parser(
+        "add", help=get_string("argparse_installs_add_help"))
+    installs_add_parser.add_argument("name")
+    installs_add_parser.add_argument("path")
+    installs_add_parser.add_argument("--branch", default=None,
+                                     help=get_string("argparse_installs_branch_help"))
+    installs_remove_parser = installs_subparsers.add_parser(
+        "remove", help=get_string("argparse_installs_remove_help"))
+    installs_remove_parser.add_argument("name")
     token_parser = subparsers.add_parser(
         "token", help=get_string("argparse_token_help"))
     subparsers.add_parser(
         "self-update", help=get_string("argparse_self_update_help"))
     token_parser.add_argument(
         "--clear", action="store_true", help=get_string("argparse_token_clear_help"))
-    return parser.parse_args()
+    args = parser.parse_args()
+    level = args.backup_compression_level
+    if level is not None and args.backup_format in BACKUP_MAX_COMPRESSION_LEVELS:
+        min_level = 0 if args.backup_format == "xz" else 1
+        max_level = BACKUP_MAX_COMPRESSION_LEVELS[args.backup_format]
+        if not min_level <= level <= max_level:
+            parser.error(get_string("argparse_backup_level_invalid",
+                         format=args.backup_format, min=min_level, max=max_level))
+    if getattr(args, "channel", None) == "stable" and getattr(args, "branch", None):
+        parser.error(get_string("argparse_channel_branch_conflict"))
+    if getattr(args, "all", False) and (args.channel or args.branch or args.interactive):
+        parser.error(get_string("argparse_all_conflict"))
+    if args.command == "daemon" and args.no_cache and not (args.install_systemd or args.remove_systemd):
+        parser.error(get_string("argparse_daemon_no_cache"))
+    return args
 
 
 def determine_install_path(args):
     if args.install_path:
-        yabridge_dir = args.install_path.resolve()
+        yabridge_dir = Path(os.path.abspath(args.install_path))
         print_info(get_string("path_use_custom",
                    path=f"{C.OKCYAN}{args.install_path}{C.ENDC}"))
     elif PATH_CONFIG_FILE.exists() and PATH_CONFIG_FILE.read_text().strip():
-        yabridge_dir = Path(PATH_CONFIG_FILE.read_text().strip()).resolve()
+        yabridge_dir = Path(os.path.abspath(PATH_CONFIG_FILE.read_text().strip()))
         print_info(get_string("path_use_saved",
                    path=f"{C.OKCYAN}{yabridge_dir}{C.ENDC}"))
     else:
@@ -872,19 +3352,575 @@ def determine_install_path(args):
                    path=f"{C.OKCYAN}{yabridge_dir}{C.ENDC}"))
     return yabridge_dir, yabridge_dir / "yabridgectl"
 
+
+def load_check_cache():
+    try:
+        return json.loads(CHECK_CACHE_FILE.read_text())
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def remember_remote_version(target, remote_version):
+    """Stores the latest version of a target ("stable" or a branch) for `check`."""
+    cache = load_check_cache()
+    cache[target] = {"version": remote_version, "checked_at": time.time()}
+    CONFIG_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_file = CHECK_CACHE_FILE.with_suffix(".tmp")
+    tmp_file.write_text(json.dumps(cache, indent=2))
+    os.replace(tmp_file, CHECK_CACHE_FILE)
+
+
+def unattended_token():
+    """Returns a token that can be had without asking anyone (environment or keyring), or None."""
+    return os.environ.get("GITHUB_TOKEN") or get_github_token_from_keyring()
+
+
+def fetch_remote_version(target, use_cache=True):
+    """Looks up the latest version of a target on GitHub without asking for anything."""
+    client = GitHubClient(cache=ResponseCache() if use_cache else None)
+    try:
+        if target == "stable":
+            remote_version, _ = get_latest_stable_info(client)
+        else:
+            # Listing workflow runs works without a token, but one raises the rate limit
+            token = unattended_token()
+            if token:
+                client.set_token(token)
+            remote_version, _ = get_latest_run_info(target, client)
+    finally:
+        client.close()
+    remember_remote_version(target, remote_version)
+    return remote_version
+
+
+@profiler.span("check")
+def run_check(args):
+    """The `check` command: is a newer version than the installed one available?
+
+    Answers from the check cache while it's younger than `args.ttl` seconds
+    (without importing `requests` at all) and only asks GitHub after that.
+    Prints a single line (nothing with --quiet) and returns the exit code.
+    It never waits for a lock: while an update is running, that's reported
+    instead, as the installed version is about to change anyway.
+    """
+    try:
+        # Only the result line is of interest, not how it was found
+        with contextlib.redirect_stdout(io.StringIO()):
+            yabridge_dir, _ = determine_install_path(args)
+            # An update in progress may have moved the installation away for a moment
+            lock = try_lock(install_lock_path(yabridge_dir), shared=True)
+            if lock is None:
+                raise BlockingIOError(get_string("check_busy"))
+            try:
+                target, local_version = read_installed_target(yabridge_dir)
+            finally:
+                lock.close()
+
+            entry = load_check_cache().get(target)
+            cached = not args.no_cache and entry is not None and \
+                0 <= time.time() - entry["checked_at"] < args.ttl
+            if cached:
+                remote_version = entry["version"]
+            elif not load_requests():
+                raise ImportError("The 'requests' module is required to query GitHub.")
+            else:
+                remote_version = fetch_remote_version(target, not args.no_cache)
+    except BlockingIOError as e:
+        if not args.quiet:
+            print(e)
+        run_result.update(status="busy")
+        return EXIT_ERROR
+    except Exception as e:
+        print_error(get_string("check_failed"), details=e)
+        run_result.update(status="error", error=str(e))
+        return EXIT_ERROR
+
+    update_available = remote_version != local_version
+    run_result.update(branch=target, old_version=local_version, new_version=remote_version,
+                      cached=cached, status="update_available" if update_available else "up_to_date")
+    if not args.quiet:
+        if update_available:
+            # Commit hashes are shortened like everywhere else, release tags are short already
+            length = None if target == "stable" else 7
+            print(get_string("check_update_available", branch=target,
+                             local=local_version[:length], remote=remote_version[:length]))
+        else:
+            print(get_string("check_up_to_date", branch=target))
+    return EXIT_UPDATE_AVAILABLE if update_available else EXIT_OK
+
+
+# --- Background Pre-fetching ---
+
+
+def read_installed_target(yabridge_dir):
+    """Returns the branch ("stable" for releases) and version of an installation from its `.version`."""
+    try:
+        local_info = json.loads((yabridge_dir / ".version").read_text())
+    except (OSError, json.JSONDecodeError):
+        local_info = {}
+    target, local_version = local_info.get("branch"), local_info.get("sha")
+    if not target or not local_version:
+        raise FileNotFoundError(get_string("check_not_installed", path=yabridge_dir))
+    return target, local_version
+
+
+def update_downloads(remote_version, assets=None, run_artifacts=None):
+    """Returns (name, url, store key, digest) of everything an update to `remote_version` downloads."""
+    if run_artifacts is not None:
+        return [(name, artifact["archive_download_url"], f"artifact-{artifact['id']}",
+                 parse_digest(artifact.get("digest")))
+                for name, artifact in run_artifacts]
+    asset = next((a for a in assets if a["name"] ==
+                 f"yabridge-{remote_version.lstrip('v')}.tar.gz"), None)
+    if not asset:
+        raise ValueError(get_string("install_no_artifacts_url"))
+    return [(asset["name"], asset["browser_download_url"], f"asset-{asset['name']}",
+             parse_digest(asset.get("digest")))]
+
+
+def fetch_downloads(downloads, client, store):
+    """Downloads everything from `update_downloads` that isn't in the artifact store yet."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, url, key, digest in downloads:
+            if lookup_artifact(name, store, key, digest) is None:
+                download_artifact(name, url, client, Path(tmpdir), store, key,
+                                  expected_sha256=digest)
+
+
+@profiler.span("prefetch")
+def prefetch_update(yabridge_dir, client, store):
+    """Downloads a newer version of the installed branch into the artifact store.
+
+    A later `update` then finds everything in the store and only has to
+    extract and activate it. Returns the new version, or None if the
+    installation is up to date.
+    """
+    target, local_version = read_installed_target(yabridge_dir)
+    if target == "stable":
+        remote_version, assets = get_latest_stable_info(client)
+        downloads = update_downloads(remote_version, assets=assets)
+    else:
+        # Artifact downloads always need a token
+        token = unattended_token()
+        if not token:
+            raise ValueError(get_string("token_none_available"))
+        client.set_token(token)
+        remote_version, artifacts_url = get_latest_run_info(target, client)
+        downloads = update_downloads(remote_version, run_artifacts=get_run_artifacts(artifacts_url, client))
+    remember_remote_version(target, remote_version)
+    if remote_version == local_version:
+        print_info(get_string("daemon_up_to_date", branch=target))
+        return None
+
+    fetch_downloads(downloads, client, store)
+    print_success(get_string("daemon_prefetched", branch=target, version=remote_version))
+    return remote_version
+
+
+def rate_limit_wait():
+    """Returns how long to wait for the GitHub rate limit to recover, 0 if there are enough requests left."""
+    if _rate_limit_remaining is None or _rate_limit_remaining >= DAEMON_MIN_RATE_LIMIT:
+        return 0
+    return max(0, (_rate_limit_reset or 0) - time.time())
+
+
+def run_daemon(yabridge_dir, client, store, interval_minutes=DAEMON_INTERVAL_MINUTES,
+               jitter=DAEMON_JITTER_SECONDS, once=False):
+    """Checks for updates and pre-fetches them, every `interval_minutes` plus up to `jitter` seconds.
+
+    A round is skipped while a foreground `update` holds the update lock.
+    Failed rounds are retried sooner, with an exponential backoff up to the
+    regular interval, and a nearly exhausted rate limit postpones the next
+    round until it resets. With `once`, a single round is run and errors are
+    raised (that's what the systemd timer uses).
+    """
+    interval = interval_minutes * 60
+    failures = 0
+    while True:
+        delay = interval
+        lock = try_lock(CONFIG_LOCK_FILE)
+        if lock is None:
+            print_info(get_string("daemon_busy"))
+        else:
+            try:
+                prefetch_update(yabridge_dir, client, store)
+                failures = 0
+            except (requests.RequestException, IOError, ValueError) as e:
+                if once:
+                    raise
+                failures += 1
+                delay = min(DAEMON_RETRY_SECONDS * 2 ** (failures - 1), interval)
+                print_error(get_string("daemon_round_failed"), details=e)
+            finally:
+                lock.close()
+        if once:
+            return
+        rate_limit_delay = rate_limit_wait()
+        if rate_limit_delay > delay:
+            print_warning(get_string("daemon_rate_limited",
+                          minutes=int(rate_limit_delay // 60) + 1))
+            delay = rate_limit_delay
+        # Spread the requests of many machines over time
+        delay += random.uniform(0, jitter)
+        print_info(get_string("daemon_sleeping", minutes=int(delay // 60)))
+        time.sleep(delay)
+
+
+def install_systemd_units(yabridge_dir, interval_minutes=DAEMON_INTERVAL_MINUTES, jitter=DAEMON_JITTER_SECONDS):
+    """Writes a systemd user service and timer that run `daemon --once` periodically."""
+    print_header(get_string("daemon_systemd_header"))
+    script = os.path.abspath(sys.argv[0])
+    service = f"""[Unit]
+Description=Pre-download yabridge updates
+Wants=network-online.target
+After=network-online.target
+
+[Service]
+Type=oneshot
+ExecStart="{sys.executable}" "{script}" --yes --install-path "{yabridge_dir}" daemon --once
+Nice=10
+IOSchedulingClass=idle
+"""
+    timer = f"""[Unit]
+Description=Check for yabridge updates periodically
+
+[Timer]
+OnBootSec=15min
+OnUnitActiveSec={interval_minutes}min
+RandomizedDelaySec={jitter}
+Persistent=true
+
+[Install]
+WantedBy=timers.target
+"""
+    SYSTEMD_USER_DIR.mkdir(parents=True, exist_ok=True)
+    (SYSTEMD_USER_DIR / f"{SYSTEMD_UNIT_NAME}.service").write_text(service)
+    (SYSTEMD_USER_DIR / f"{SYSTEMD_UNIT_NAME}.timer").write_text(timer)
+    print_success(get_string("daemon_systemd_written", path=f"{C.OKCYAN}{SYSTEMD_USER_DIR}{C.ENDC}"))
+
+    enable_command = ["systemctl", "--user", "enable", "--now", f"{SYSTEMD_UNIT_NAME}.timer"]
+    if check_command_exists("systemctl") and confirm(get_string("daemon_systemd_enable_prompt")):
+        subprocess.run(["systemctl", "--user", "daemon-reload"], check=True)
+        subprocess.run(enable_command, check=True)
+        print_success(get_string("daemon_systemd_enabled"))
+    else:
+        print_info(get_string("daemon_systemd_enable_hint", command=" ".join(enable_command)))
+
+
+def remove_systemd_units():
+    """Disables and removes the units written by install_systemd_units()."""
+    print_header(get_string("daemon_systemd_header"))
+    if check_command_exists("systemctl"):
+        subprocess.run(["systemctl", "--user", "disable", "--now", f"{SYSTEMD_UNIT_NAME}.timer"], check=False)
+    for suffix in (".service", ".timer"):
+        (SYSTEMD_USER_DIR / f"{SYSTEMD_UNIT_NAME}{suffix}").unlink(missing_ok=True)
+    if check_command_exists("systemctl"):
+        subprocess.run(["systemctl", "--user", "daemon-reload"], check=False)
+    print_success(get_string("daemon_systemd_removed"))
+
+
+# --- Multiple Installations ---
+
+
+def load_installs():
+    try:
+        installs = json.loads(INSTALLS_CONFIG_FILE.read_text())
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return installs if isinstance(installs, dict) else {}
+
+
+def save_installs(installs):
+    CONFIG_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_file = INSTALLS_CONFIG_FILE.with_suffix(".tmp")
+    tmp_file.write_text(json.dumps(installs, indent=2))
+    os.replace(tmp_file, INSTALLS_CONFIG_FILE)
+
+
+def shared_parent_conflict(paths):
+    """Returns two of the installation paths that share a parent directory, or None.
+
+    Backups (`yabridge-backups`) and staged versions (`yabridge-versions`,
+    including the `current` link) live next to an installation, so two
+    installations in the same directory would mix them up.
+    """
+    seen = {}
+    for path in paths:
+        path = Path(os.path.abspath(path))
+        other = seen.setdefault(path.parent, path)
+        if other != path:
+            return other, path
+    return None
+
+
+def check_install_paths(installs, default_dir=None):
+    """Raises a ValueError if installations (and the default one, if it exists) share a parent directory."""
+    paths = [install["path"] for install in installs.values()]
+    if default_dir is not None and (default_dir.exists() or default_dir.is_symlink()):
+        paths.append(default_dir)
+    conflict = shared_parent_conflict(paths)
+    if conflict:
+        raise ValueError(get_string("installs_shared_parent", first=conflict[0], second=conflict[1]))
+
+
+def manage_installs(args, default_dir=None):
+    """The `installs` command: lists, adds or removes named installations."""
+    installs = load_installs()
+    if args.installs_action == "add":
+        path = Path(os.path.abspath(os.path.expanduser(args.path)))
+        check_install_paths({**installs, args.name: {"path": str(path)}}, default_dir)
+        branch = args.branch
+        if branch is None:
+            # Follow whatever is installed there already
+            with contextlib.suppress(FileNotFoundError):
+                branch, _ = read_installed_target(path)
+        if branch is None:
+            raise ValueError(get_string("installs_branch_required", path=path))
+        installs[args.name] = {"path": str(path), "branch": branch}
+        save_installs(installs)
+        print_success(get_string("installs_added", name=args.name, path=path, branch=branch))
+    elif args.installs_action == "remove":
+        if installs.pop(args.name, None) is None:
+            raise ValueError(get_string("installs_unknown", name=args.name))
+        save_installs(installs)
+        print_success(get_string("installs_removed", name=args.name))
+    else:
+        print_header(get_string("installs_header"))
+        if not installs:
+            print_info(get_string("installs_none"))
+        for name, install in sorted(installs.items()):
+            try:
+                branch, version = read_installed_target(Path(install["path"]))
+                version = version if branch == "stable" else version[:7]
+            except FileNotFoundError:
+                version = get_string("status_unknown_version")
+            print(f"  {C.OKCYAN}{name}{C.ENDC}: {install['path']} ({install['branch']}, {version})")
+
+
+def same_file_system(a, b):
+    """True if hardlinks between the (existing) paths `a` and `b` are possible."""
+    return os.stat(a).st_dev == os.stat(b).st_dev
+
+
+def install_from_sibling(source_dir, yabridge_dir, backups=None, staged=False):
+    """Installs the version that's installed at `source_dir` by hardlinking its files.
+
+    Used for the remaining targets of `update --all` on the same file system,
+    nothing has to be extracted again.
+    """
+    source_dir = Path(os.path.realpath(source_dir))
+    version_data = json.loads((source_dir / ".version").read_text())
+    staged = staged or is_staged_install(yabridge_dir)
+    install_dir, _ = prepare_install_dir(yabridge_dir, staged, backups)
+    shutil.copytree(source_dir, install_dir, symlinks=True, copy_function=link_or_copy,
+                    dirs_exist_ok=True, ignore=shutil.ignore_patterns(".version"))
+    write_version_file(install_dir, version_data)
+    if staged:
+        complete_staged_install(yabridge_dir, install_dir, version_data["sha"], backups)
+    print_success(get_string("installs_linked", path=yabridge_dir, source=source_dir))
+    prune_backups(yabridge_dir.parent)
+
+
+@profiler.span("update_all_installs")
+def update_all_installs(installs, client, store, backup_format="dir", compression_level=None,
+                        staged=False, delta=False):
+    """Updates every configured installation, returns {name: result} for the ones that were looked at.
+
+    GitHub is asked once per distinct branch and every artifact is downloaded
+    once into the artifact store. Each branch is then installed into its
+    first target from the store; the other targets of the branch get
+    hardlinks to those files if they are on the same file system, or are
+    installed from the store as well. Branches are processed in parallel.
+    Installations have to be in different directories, see
+    `check_install_paths`.
+    """
+    targets = {}
+    for name, install in sorted(installs.items()):
+        path = Path(install["path"])
+        try:
+            _, local_version = read_installed_target(path)
+        except FileNotFoundError:
+            local_version = None
+        targets[name] = {"path": path, "branch": install["branch"], "old_version": local_version}
+
+    latest = {}
+    for branch in sorted({target["branch"] for target in targets.values()}):
+        if branch == "stable":
+            version, assets = get_latest_stable_info(client)
+            latest[branch] = {"version": version, "assets": assets}
+        else:
+            if "Authorization" not in client.session.headers:
+                authenticate(client)
+            version, artifacts_url = get_latest_run_info(branch, client)
+            with profiler.span("list artifacts"):
+                run_artifacts = get_run_artifacts(artifacts_url, client)
+            latest[branch] = {"version": version, "artifacts_url": artifacts_url, "run_artifacts": run_artifacts}
+        remember_remote_version(branch, version)
+
+    results = {}
+    groups = {}
+    for name, target in targets.items():
+        new_version = latest[target["branch"]]["version"]
+        up_to_date = target["old_version"] == new_version
+        results[name] = {"path": str(target["path"]), "branch": target["branch"],
+                         "old_version": target["old_version"], "new_version": new_version,
+                         "status": "up_to_date" if up_to_date else "pending"}
+        print_info(get_string("installs_plan", name=f"{C.OKCYAN}{name}{C.ENDC}", branch=target["branch"],
+                   old=target["old_version"] or "-", new=new_version,
+                   state=get_string("installs_state_current" if up_to_date else "installs_state_update")))
+        if not up_to_date:
+            groups.setdefault(target["branch"], []).append(name)
+    if not groups:
+        print_success(get_string("already_latest"))
+        return results
+    if not confirm(get_string("installs_confirm", count=sum(len(names) for names in groups.values())),
+                   default=True):
+        print_info(get_string("update_aborted"))
+        for names in groups.values():
+            for name in names:
+                results[name]["status"] = "declined"
+        return results
+
+    # Download everything once, the installations below only read from the store
+    for branch in groups:
+        fetch_downloads(update_downloads(latest[branch]["version"], latest[branch].get("assets"),
+                                         latest[branch].get("run_artifacts")), client, store)
+
+    def install(name, source_dir=None):
+        path = targets[name]["path"]
+        branch = targets[name]["branch"]
+        backups = BackupStore(path.parent / "yabridge-backups", backup_format, compression_level)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if source_dir is not None and same_file_system(source_dir, path.parent):
+            install_from_sibling(source_dir, path, backups, staged)
+        elif branch == "stable":
+            perform_stable_installation(latest[branch]["assets"], client, path,
+                                        latest[branch]["version"], store, backups, staged, delta)
+        else:
+            perform_installation(latest[branch]["artifacts_url"], client, path,
+                                 latest[branch]["version"], branch, store, backups, staged, delta,
+                                 latest[branch]["run_artifacts"], save_path=False)
+        results[name]["status"] = "updated"
+
+    def install_group(names):
+        first, others = names[0], names[1:]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(others))) as executor:
+            first_future = executor.submit(install, first)
+            concurrent.futures.wait([first_future])
+            record_failure(first, first_future)
+            # If the first installation failed there's nothing to link to, the others install from the store
+            source_dir = targets[first]["path"] if first_future.exception() is None else None
+            futures = {executor.submit(install, name, source_dir): name for name in others}
+            for future in concurrent.futures.as_completed(futures):
+                record_failure(futures[future], future)
+
+    def record_failure(name, future):
+        error = future.exception()
+        if error is not None:
+            print_error(get_string("installs_failed", name=name), details=error)
+            results[name].update(status="error", error=str(error))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(groups)) as executor:
+        futures = {executor.submit(install_group, names): names[0] for names in groups.values()}
+        for future in concurrent.futures.as_completed(futures):
+            record_failure(futures[future], future)
+    return results
+
+
+def requested_target(args, local_branch):
+    """Returns the target asked for with --channel/--branch ("stable" or a branch name), or None."""
+    channel = getattr(args, 'channel', None)
+    branch = getattr(args, 'branch', None)
+    if branch:
+        return branch
+    if channel == "stable":
+        return "stable"
+    if channel == "dev":
+        # Stay on the installed development branch if there is one
+        if local_branch and local_branch != "stable":
+            return local_branch
+        raise ValueError(get_string("batch_branch_required"))
+    return None
+
+
+def authenticate(client):
+    """Adds a GitHub token to the client and returns where it came from."""
+    token, token_source = get_token()
+    if not token:
+        raise ValueError(get_string("token_none_available"))
+    client.set_token(token)
+    return token_source
+
+
+def fail_run(error):
+    """Records the error that ended the run and exits with EXIT_ERROR."""
+    run_result.update(status="error", error=str(error))
+    sys.exit(EXIT_ERROR)
+
+
+def write_json_result(stream):
+    """Writes the outcome of the run together with its timings to `stream`."""
+    json.dump({**run_result, **profiler.summary()}, stream, indent=2)
+    stream.write("\n")
+    stream.flush()
+
+
 # --- Main Execution ---
+# Commands that only read the installation, and the ones that change it (or its backups)
+SHARED_LOCK_COMMANDS = ("status", "verify")
+EXCLUSIVE_LOCK_COMMANDS = ("update", "restore", "sync", "prune-backups")
 
 
 def main():
     """Main script logic."""
+    global _assume_yes
     args = handle_arguments()
     command = args.command if args.command else 'update'
+    _assume_yes = args.yes
+    run_result.update(command=command)
+    if args.json:
+        # Everything meant for humans goes to stderr, stdout only carries the result
+        atexit.register(write_json_result, sys.stdout)
+        sys.stdout = sys.stderr
+    if args.profile or args.metrics_log:
+        # Also covers the many sys.exit() calls below
+        atexit.register(profiler.finish, command, args.profile,
+                        METRICS_LOG_FILE if args.metrics_log else None)
+    if command == 'check':
+        sys.exit(run_check(args))
+    if not load_requests():
+        # This message is not translated, it's kept simple and includes
+        # multi-language install hints.
+        print_error("The 'requests' module is required. Please install it, e.g., with 'pip install requests', 'sudo pacman -S python-requests', or 'sudo apt install python3-requests'.")
+        sys.exit(1)
     yabridge_dir, yabridgectl_path = determine_install_path(args)
+    # One pooled client for the whole run, the token is added once it's needed
+    client = GitHubClient(pool_size=max(HTTP_POOL_SIZE, getattr(args, 'jobs', DEFAULT_PROBE_WORKERS)),
+                          cache=None if args.no_cache else ResponseCache())
+    store = None if args.no_cache else ArtifactStore(
+        max_bytes=args.artifact_cache_size * 1024 * 1024, max_age_days=args.artifact_cache_max_age)
+    backups = BackupStore(yabridge_dir.parent / "yabridge-backups",
+                          args.backup_format, args.backup_compression_level)
+    staged = getattr(args, 'staged', False)
+    delta = getattr(args, 'delta', False)
+    locks = []
 
     try:
+        # Config before installation, always in this order so two runs can't deadlock
+        if command in SHARED_LOCK_COMMANDS:
+            locks.append(hold_lock(install_lock_path(yabridge_dir), True, args.lock_timeout))
+        elif command in EXCLUSIVE_LOCK_COMMANDS:
+            locks.append(hold_lock(CONFIG_LOCK_FILE, False, args.lock_timeout))
+            locks.append(hold_lock(install_lock_path(yabridge_dir), False, args.lock_timeout))
+        elif command in ('token', 'installs'):
+            locks.append(hold_lock(CONFIG_LOCK_FILE, False, args.lock_timeout))
+
         if command == 'status':
             print_header(get_string("status_header"))
             print(f"{get_string('status_path')}{C.OKCYAN}{yabridge_dir}{C.ENDC}")
+            if is_staged_install(yabridge_dir):
+                print(f"{get_string('status_staged')}{C.OKCYAN}{active_version_dir(yabridge_dir)}{C.ENDC}")
+                print(f"{get_string('status_staged_versions')}{C.OKCYAN}{len(list_staged_versions(yabridge_dir))}{C.ENDC}")
             if yabridgectl_path.exists():
                 print(
                     f"{get_string('status_yabridgectl_found')}{C.OKGREEN}{get_string('status_yes')}{C.ENDC}")
@@ -908,18 +3944,46 @@ def main():
             sys.exit(0)
 
         if command == 'sync':
-            run_sync(yabridgectl_path)
+            # An explicit sync always runs, the fingerprint is refreshed afterwards
+            run_sync(yabridgectl_path, force=True)
             sys.exit(0)
 
         if command == 'restore':
             restore_from_backup(yabridge_dir)
-            run_sync(yabridgectl_path)
+            run_sync(yabridgectl_path, args.force_sync)
             check_and_update_path(yabridge_dir)  # Check path after restore
             print_success(get_string("restore_process_complete"))
             sys.exit(0)
 
+        if command == 'daemon':
+            if args.install_systemd:
+                install_systemd_units(yabridge_dir, args.interval, args.jitter)
+            elif args.remove_systemd:
+                remove_systemd_units()
+            else:
+                run_daemon(yabridge_dir, client, store, args.interval, args.jitter, args.once)
+            sys.exit(0)
+
+        if command == 'verify':
+            sys.exit(0 if verify_installation(yabridge_dir, args.verify_jobs) else 1)
+
         if command == 'prune-backups':
-            prune_backups(yabridge_dir.parent, args.keep)
+            policy = {"keep_last": args.keep, "keep_per_branch": args.keep_per_branch,
+                      "keep_daily": args.keep_daily, "keep_weekly": args.keep_weekly,
+                      "keep_monthly": args.keep_monthly, "max_age_days": args.max_age,
+                      "max_size_mb": args.max_size}
+            policy = {key: value for key, value in policy.items() if value is not None}
+            if not policy:
+                policy = dict(DEFAULT_RETENTION_POLICY) if args.save else load_retention_policy()
+            if args.save:
+                save_retention_policy(policy)
+                print_info(get_string("backup_policy_saved",
+                           path=f"{C.OKCYAN}{RETENTION_CONFIG_FILE}{C.ENDC}"))
+            prune_backups(yabridge_dir.parent, policy, args.dry_run)
+            sys.exit(0)
+
+        if command == 'installs':
+            manage_installs(args, yabridge_dir)
             sys.exit(0)
 
         if command == 'token':
@@ -931,9 +3995,39 @@ def main():
 
         # Self-update must be handled before other commands that need a token
         if command == 'self-update':
-            perform_self_update()
+            perform_self_update(client)
             sys.exit(0)
 
+        if command == 'update' and args.all:
+            print_header(get_string("updater_header"))
+            installs = load_installs()
+            if not installs:
+                raise ValueError(get_string("installs_none"))
+            # installs.json may have been edited by hand
+            check_install_paths(installs, yabridge_dir)
+            # Sorted, so concurrent runs always take the locks in the same order
+            for path in sorted({str(Path(install["path"])) for install in installs.values()} - {str(yabridge_dir)}):
+                locks.append(hold_lock(install_lock_path(Path(path)), False, args.lock_timeout))
+            with tempfile.TemporaryDirectory() as tmp_store_dir:
+                # With --no-cache every build is still only downloaded once, but nothing is kept
+                results = update_all_installs(installs, client,
+                                              store or ArtifactStore(Path(tmp_store_dir), max_bytes=sys.maxsize),
+                                              args.backup_format, args.backup_compression_level, staged, delta)
+            run_result["installs"] = results
+            # yabridgectl's config is shared, so one sync covers every installation
+            updated = [Path(result["path"]) for result in results.values() if result["status"] == "updated"]
+            if updated:
+                sync_dir = yabridge_dir if yabridge_dir in updated else updated[0]
+                run_result["sync"] = run_sync(sync_dir / "yabridgectl", args.force_sync)
+            if any(result["status"] == "error" for result in results.values()):
+                run_result.update(status="error")
+                sys.exit(EXIT_ERROR)
+            if any(result["status"] == "declined" for result in results.values()):
+                run_result.update(status="declined")
+                sys.exit(EXIT_DECLINED)
+            run_result.update(status="ok")
+            sys.exit(EXIT_OK)
+
         if command == 'update':
             print_header(get_string("updater_header"))
 
@@ -952,91 +4046,91 @@ def main():
                         "version_file_corrupt_interactive"))
                     is_interactive = True
 
-            if not is_interactive and local_info and local_info.get("branch") and local_info.get("sha"):
-                local_branch, local_sha = local_info["branch"], local_info["sha"]
-
-                if local_branch == "stable":
-                    remote_tag, assets = get_latest_stable_info({})
-                    if remote_tag != local_sha:
-                        print_info(get_string(
-                            "stable_update_available", local_sha=f"{C.WARNING}{local_sha}{C.ENDC}", remote_sha=f"{C.OKGREEN}{remote_tag}{C.ENDC}"))
-                        if input(f"{C.WARNING}{get_string('install_now_prompt')}{C.ENDC} ").lower().strip() in ["", "j", "ja", "y", "yes"]:
-                            perform_stable_installation(
-                                assets, {}, yabridge_dir, remote_tag)
-                            check_and_update_path(yabridge_dir)
-                            run_sync(yabridgectl_path)
-                        else:
-                            print_info(get_string("update_aborted"))
-                    else:
-                        print_success(get_string("already_latest"))
+            local_branch = local_info.get("branch") if local_info else None
+            local_sha = local_info.get("sha") if local_info else None
+            run_result.update(old_branch=local_branch, old_version=local_sha)
+
+            # "stable" or a development branch; None means the user picks one
+            target = requested_target(args, local_branch)
+            if target is None and not is_interactive and local_branch and local_sha:
+                target = local_branch
+            runs_by_branch = {}
+            if target is None:
+                if _assume_yes:
+                    raise ValueError(get_string("batch_target_required"))
+                print_info(get_string("no_local_version_interactive"))
+                if select_install_type() == "stable":
+                    target = "stable"
                 else:
-                    # Token is only needed for development branch updates
-                    token, token_source = get_token()
-                    if not token:
-                        raise ValueError(get_string("token_none_available"))
-                    headers = {"Authorization": f"Bearer {token}",
-                               "Accept": "application/vnd.github.v3+json"}
-                    print_info(get_string("checking_for_updates",
-                               branch=f"{C.OKCYAN}{local_branch}{C.ENDC}"))
-                    remote_sha, artifacts_url = get_latest_run_info(
-                        local_branch, headers)
+                    token_source = authenticate(client)
+                    target = select_branch(
+                        client, token_source, getattr(args, 'jobs', DEFAULT_PROBE_WORKERS),
+                        getattr(args, 'discovery', "runs"), runs_by_branch)
 
-                    if remote_sha != local_sha:
+            if target == "stable":
+                remote_version, assets = get_latest_stable_info(client)
+            else:
+                # Token is only needed for development branches
+                authenticate(client)
+                if local_branch == target:
+                    print_info(get_string("checking_for_updates",
+                               branch=f"{C.OKCYAN}{target}{C.ENDC}"))
+                remote_version, artifacts_url = get_latest_run_info(
+                    target, client, runs_by_branch)
+            run_result.update(channel="stable" if target == "stable" else "dev",
+                              branch=target, new_version=remote_version)
+            remember_remote_version(target, remote_version)
+
+            same_target = not is_interactive and local_branch == target
+            if same_target and remote_version == local_sha:
+                print_success(get_string("already_latest"))
+                run_result.update(status="up_to_date")
+            else:
+                if same_target:
+                    if target == "stable":
                         print_info(get_string(
-                            "update_available", local_sha=f"{C.WARNING}{local_sha[:7]}{C.ENDC}", remote_sha=f"{C.OKGREEN}{remote_sha[:7]}{C.ENDC}", branch=local_branch))
-                        if input(f"{C.WARNING}{get_string('install_now_prompt')}{C.ENDC} ").lower().strip() in ["", "j", "ja", "y", "yes"]:
-                            perform_installation(
-                                artifacts_url, headers, yabridge_dir, remote_sha, local_branch)
-                            check_and_update_path(yabridge_dir)
-                            run_sync(yabridgectl_path)
-                        else:
-                            print_info(get_string("update_aborted"))
+                            "stable_update_available", local_sha=f"{C.WARNING}{local_sha}{C.ENDC}", remote_sha=f"{C.OKGREEN}{remote_version}{C.ENDC}"))
                     else:
-                        print_success(get_string("already_latest"))
-            else:
-                print_info(get_string("no_local_version_interactive"))
-                install_type = select_install_type()
+                        print_info(get_string(
+                            "update_available", local_sha=f"{C.WARNING}{local_sha[:7]}{C.ENDC}", remote_sha=f"{C.OKGREEN}{remote_version[:7]}{C.ENDC}", branch=target))
+                    if not confirm(get_string('install_now_prompt'), default=True):
+                        print_info(get_string("update_aborted"))
+                        run_result.update(status="declined")
+                        sys.exit(EXIT_DECLINED)
 
-                if install_type == "stable":
-                    remote_tag, assets = get_latest_stable_info({})
+                if target == "stable":
                     perform_stable_installation(
-                        assets, {}, yabridge_dir, remote_tag)
+                        assets, client, yabridge_dir, remote_version, store, backups, staged, delta)
                 else:
-                    # Token is only needed for development branch installation
-                    token, token_source = get_token()
-                    if not token:
-                        raise ValueError(get_string("token_none_available"))
-                    headers = {"Authorization": f"Bearer {token}",
-                               "Accept": "application/vnd.github.v3+json"}
-                    branch = select_branch(headers, token_source)
-                    remote_version, artifacts_url = get_latest_run_info(
-                        branch, headers)
                     perform_installation(
-                        artifacts_url, headers, yabridge_dir, remote_version, branch)
+                        artifacts_url, client, yabridge_dir, remote_version, target, store, backups, staged, delta)
+                run_result.update(status="updated")
                 check_and_update_path(yabridge_dir)
-                run_sync(yabridgectl_path)
+            # Without an install, only sync if the plugin directories are known to have changed
+            run_result["sync"] = run_sync(yabridgectl_path, args.force_sync,
+                                          only_if_changed=run_result["status"] == "up_to_date")
 
     except requests.RequestException as e:
         print_error(get_string("error_network"), details=e)
+        fail_run(e)
     except subprocess.SubprocessError as e:
         print_error(get_string("error_subprocess"), details=e)
+        fail_run(e)
+    except TimeoutError as e:
+        print_error(get_string("error_locked"), details=e)
+        fail_run(e)
     except (IOError, zipfile.BadZipFile, tarfile.TarError) as e:
         print_error(get_string("error_file_io"), details=e)
+        fail_run(e)
     except (FileNotFoundError, ValueError) as e:
         print_error(get_string("error_internal"), details=e)
+        fail_run(e)
     except Exception as e:
         print_error(get_string("error_unexpected"), details=e)
-        sys.exit(1)
+        fail_run(e)
 
     print_success(get_string("script_finished_success"))
 
 
 if __name__ == "__main__":
-    try:
-        import requests
-    except ImportError:
-        # This message cannot be translated as the translation engine is not yet available.
-        # It's kept simple and includes multi-language install hints.
-        print_error("The 'requests' module is required. Please install it, e.g., with 'pip install requests', 'sudo pacman -S python-requests', or 'sudo apt install python3-requests'.")
-        sys.exit(1)
     main()